@@ -1,32 +1,98 @@
 import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from app.replicas import RoutingSession
 
-# Initialize SQLAlchemy globally
-db = SQLAlchemy()
+# Initialize SQLAlchemy globally; the session routes read-only requests to replicas
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-def create_app():
+def create_app(config_object='config.Config'):
     app = Flask(__name__)
 
     # Load configuration settings
-    app.config.from_object('config.Config')
+    app.config.from_object(config_object)
     
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'submissions')
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     
-    # Initialize the database connection
+    # Pool options and read-replica binds, then the database connection
+    from app.replicas import configure_engines, init_app as init_replicas
+    configure_engines(app)
     db.init_app(app)
+    init_replicas(app)
+
+    # Fail requests that exceed their declared SQL statement budget
+    from app.query_budget import init_app as init_query_budget
+    init_query_budget(app)
+
+    # Per-endpoint latency and SQL metrics
+    from app.metrics import init_app as init_metrics
+    init_metrics(app)
+
+    # Bounded bcrypt pool used by Person.set_password/check_password
+    from app.passwords import init_app as init_passwords
+    init_passwords(app)
+
+    # Versioned read-through cache for reference data
+    from app.cache import init_app as init_cache
+    init_cache(app)
+
+    # Content-addressed storage for assignment submissions
+    from app.storage import init_app as init_storage
+    init_storage(app)
+
+    # One-shot form POSTs (enroll, pay) keyed by a hidden idempotency key
+    from app.idempotency import init_app as init_idempotency
+    init_idempotency(app)
+
+    # Keep the full-text search documents in sync with ORM writes
+    from app.search import init_app as init_search
+    init_search(app)
+
+    # Record tombstones for deleted rows of the delta-synced tables
+    from app.sync import init_app as init_sync
+    init_sync(app)
 
     # Import and register blueprints
     from app.main import main
     from app.admin import admin
     from app.professor import professor
     from app.student import student
+    from app.api import api
     
     app.register_blueprint(main, url_prefix='/') 
     app.register_blueprint(admin, url_prefix='/admin')
     app.register_blueprint(professor, url_prefix='/professor') 
     app.register_blueprint(student, url_prefix='/student') 
+    app.register_blueprint(api, url_prefix='/api/v1')
+
+    # Shared template bytecode cache and optional precompilation of every template
+    from app.templating import init_app as init_templating
+    init_templating(app)
+
+    # Content-hashed static URLs, pre-compressed and cached as immutable
+    from app.assets import init_app as init_assets
+    init_assets(app)
+
+    # CLI commands
+    from app.attendance import attendance_cli
+    app.cli.add_command(attendance_cli)
+    from app.student_import import students_cli
+    app.cli.add_command(students_cli)
+    from app.storage import submissions_cli
+    app.cli.add_command(submissions_cli)
+    from app.enrollment import enrollment_cli
+    app.cli.add_command(enrollment_cli)
+    from app.idempotency import idempotency_cli
+    app.cli.add_command(idempotency_cli)
+    from app.migrations import db_cli
+    app.cli.add_command(db_cli)
+    from app.templating import templates_cli
+    app.cli.add_command(templates_cli)
+    from app.search import search_cli
+    app.cli.add_command(search_cli)
+    from app.sync import sync_cli
+    app.cli.add_command(sync_cli)
       
     return app
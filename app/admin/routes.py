@@ -1,7 +1,17 @@
-from flask import render_template, request, redirect, url_for, flash, session
+from flask import render_template, request, redirect, url_for, flash, session, Response, jsonify
 from functools import wraps
 from app.admin import admin
 from app.models import db, Student, Professor, Course, Department, Person, Fee, Enrollment
+from app.pagination import keyset_paginate
+from app.exports import filter_date_range, filter_equal, stream_export
+from app.query_budget import query_budget
+from app.metrics import get_registry
+from app.cache import get_cache, invalidate
+from app.reference_data import COURSES, DEPARTMENTS, courses as cached_courses, departments as cached_departments
+from app.gradebook import invalidate_gradebook
+from app.enrollment import recount_seats
+from app.attendance import recount_totals, university_totals
+from app.search import DOCUMENTS, autocomplete, search as search_documents
 
 def admin_required(f):
     @wraps(f)
@@ -15,38 +25,50 @@ def admin_required(f):
 @admin.route('/dashboard')
 @admin_required
 def dashboard():
-    return render_template('dashboard.html')
+    return render_template('dashboard.html', attendance=university_totals())
+
+@admin.route('/metrics', methods=['GET'])
+@admin_required
+def metrics():
+    body = get_registry().render() + get_cache().render_metrics()
+    return Response(body, mimetype='text/plain; version=0.0.4')
 
 #################################################################################################
 # View Routes
 @admin.route('/students', methods=['GET'])
 @admin_required
+@query_budget(2)
 def view_students():
     students = Student.query.join(Person, Student.person_id == Person.person_id).add_columns(
         Student.studID, Person.name, Person.email, Person.phone_no, Person.gender, Student.courses
-    ).all()
+    )
+    students = keyset_paginate(students, Student.studID, sortable={'name': Person.name, 'email': Person.email})
     return render_template('students/view_students.html', students=students)
 
 @admin.route('/professors')
 @admin_required
+@query_budget(2)
 def view_professors():
     professors = Professor.query.all()
     return render_template('professors/view_professors.html', professors=professors)
 
 @admin.route('/courses')
 @admin_required
+@query_budget(2)
 def view_courses():
-    courses = Course.query.all()
+    courses = keyset_paginate(Course.query, Course.courseID, sortable={'courseName': Course.courseName})
     return render_template('courses/view_courses.html', courses=courses)
 
 @admin.route('/departments')
 @admin_required
+@query_budget(2)
 def view_departments():
-    departments = Department.query.all()
+    departments = keyset_paginate(Department.query, Department.departmentID, sortable={'name': Department.name})
     return render_template('departments/view_departments.html', departments=departments)
 
 @admin.route('/payments', methods=['GET'])
 @admin_required
+@query_budget(2)
 def view_payment():
     payments = (
         Fee.query.join(Enrollment, Fee.enrollmentID == Enrollment.enrollmentID)
@@ -63,12 +85,17 @@ def view_payment():
             Enrollment.semester,
             Enrollment.status
         )
-        .all()
+    )
+    payments = keyset_paginate(
+        payments, Fee.feeID,
+        # Fee.createdAt is nullable, so it cannot be a keyset sort column
+        sortable={'dueDate': Fee.dueDate, 'amount': Fee.amount}
     )
     return render_template('payments/view_payments.html', payments=payments)
 
 @admin.route('/enrollments', methods=['GET'])
 @admin_required
+@query_budget(2)
 def view_enrollments():
     enrollments = (
         Enrollment.query.join(Student, Enrollment.studID == Student.studID)
@@ -83,17 +110,101 @@ def view_enrollments():
             Enrollment.paymentStatus,
             Enrollment.dropDate
         )
-        .all()
+    )
+    enrollments = keyset_paginate(
+        enrollments, Enrollment.enrollmentID,
+        sortable={'studID': Student.studID, 'semester': Enrollment.semester, 'enrollmentDate': Enrollment.enrollmentDate}
     )
     return render_template('enrollments/view_enrollments.html', enrollments=enrollments)
 
 
 @admin.route('/users')
 @admin_required
+@query_budget(2)
 def view_users():
-    users = Person.query.all()
+    users = keyset_paginate(
+        Person.query, Person.person_id,
+        # Person.role is an ENUM: MySQL orders it by declaration index but seeks on
+        # the string, so it cannot be a keyset sort column
+        sortable={'name': Person.name, 'email': Person.email}
+    )
     return render_template('users/view_users.html', users=users)
 
+#################################################################################################
+# Search Routes
+@admin.route('/search', methods=['GET'])
+@admin_required
+@query_budget(1)
+def search():
+    q = request.args.get('q', '').strip()
+    kind = request.args.get('kind') if request.args.get('kind') in DOCUMENTS else None
+    results = search_documents(q, kind=kind) if q else []
+    return render_template('search.html', q=q, kind=kind, kinds=list(DOCUMENTS), results=results)
+
+@admin.route('/search/autocomplete', methods=['GET'])
+@admin_required
+@query_budget(1)
+def search_autocomplete():
+    return jsonify([result.to_dict() for result in autocomplete(request.args.get('q', ''))])
+
+#################################################################################################
+
+# Export Routes
+# Column-only queries keep streamed rows out of the session identity map.
+@admin.route('/payments/export', methods=['GET'])
+@admin_required
+def export_payments():
+    payments = (
+        db.session.query(
+            Fee.feeID, Fee.enrollmentID, Student.studID, Course.courseID, Course.courseName,
+            Fee.amount, Fee.paymentMethod, Fee.dueDate, Fee.createdAt,
+            Enrollment.semester, Enrollment.status
+        )
+        .join(Enrollment, Fee.enrollmentID == Enrollment.enrollmentID)
+        .join(Student, Enrollment.studID == Student.studID)
+        .join(Course, Enrollment.courseID == Course.courseID)
+    )
+    payments = filter_equal(payments, Enrollment.semester, 'semester')
+    payments = filter_equal(payments, Enrollment.status, 'status')
+    payments = filter_date_range(payments, Fee.createdAt)
+    return stream_export(payments, Fee.feeID, [
+        'feeID', 'enrollmentID', 'studID', 'courseID', 'courseName',
+        'amount', 'paymentMethod', 'dueDate', 'createdAt', 'semester', 'status'
+    ], 'payments')
+
+@admin.route('/enrollments/export', methods=['GET'])
+@admin_required
+def export_enrollments():
+    enrollments = (
+        db.session.query(
+            Enrollment.enrollmentID, Student.studID, Course.courseID, Course.courseName,
+            Enrollment.semester, Enrollment.enrollmentDate, Enrollment.status,
+            Enrollment.paymentStatus, Enrollment.dropDate
+        )
+        .join(Student, Enrollment.studID == Student.studID)
+        .join(Course, Enrollment.courseID == Course.courseID)
+    )
+    enrollments = filter_equal(enrollments, Enrollment.semester, 'semester')
+    enrollments = filter_equal(enrollments, Enrollment.status, 'status')
+    enrollments = filter_date_range(enrollments, Enrollment.enrollmentDate)
+    return stream_export(enrollments, Enrollment.enrollmentID, [
+        'enrollmentID', 'studID', 'courseID', 'courseName', 'semester',
+        'enrollmentDate', 'status', 'paymentStatus', 'dropDate'
+    ], 'enrollments')
+
+@admin.route('/users/export', methods=['GET'])
+@admin_required
+def export_users():
+    users = db.session.query(
+        Person.person_id, Person.name, Person.email, Person.role, Person.phone_no,
+        Person.gender, Person.age, Person.dob, Person.createdAt
+    )
+    users = filter_equal(users, Person.role, 'role')
+    users = filter_date_range(users, Person.createdAt)
+    return stream_export(users, Person.person_id, [
+        'person_id', 'name', 'email', 'role', 'phone_no', 'gender', 'age', 'dob', 'createdAt'
+    ], 'users')
+
 #################################################################################################
 
 # Add Routes
@@ -162,7 +273,7 @@ def add_professor():
             return redirect(url_for('admin.add_professor'))
 
     # Fetch departments for the form
-    departments = Department.query.all()
+    departments = cached_departments()
     
         # Fetch persons who are not already professors and have the 'User' role
     available_persons = Person.query.filter(
@@ -186,6 +297,7 @@ def add_course():
         departmentID = request.form.get('departmentID')
         duration = request.form.get('duration')
         courseFee = request.form.get('courseFee')
+        capacity = request.form.get('capacity')
         description = request.form.get('description')
 
         # Validate unique course ID
@@ -207,11 +319,13 @@ def add_course():
             departmentID=departmentID,
             duration=duration,
             courseFee=float(courseFee),
+            capacity=int(capacity) if capacity else None,
             description=description
         )
         try:
             db.session.add(new_course)
             db.session.commit()
+            invalidate(COURSES)
             flash('Course added successfully!', 'success')
             return redirect(url_for('admin.view_courses'))
         except Exception as e:
@@ -219,7 +333,7 @@ def add_course():
             flash('An error occurred while adding the course. Please try again.', 'danger')
             return redirect(url_for('admin.add_course'))
 
-    departments = Department.query.all()  # Fetch departments for the dropdown
+    departments = cached_departments()  # Fetch departments for the dropdown
     return render_template('courses/add_course.html', departments=departments)
 
 
@@ -241,6 +355,7 @@ def add_department():
         new_department = Department(departmentID=departmentID, name=name, location=location, contactInfo=contactInfo)
         db.session.add(new_department)
         db.session.commit()
+        invalidate(DEPARTMENTS)
         flash('Department added successfully!', 'success')
         return redirect(url_for('admin.view_departments'))
 
@@ -276,7 +391,7 @@ def edit_professor(profID):
         flash('Professor not found!', 'danger')
         return redirect(url_for('admin.view_professors'))
 
-    departments = Department.query.all()
+    departments = cached_departments()
 
     if request.method == 'POST':
         professor.person.name = request.form['name']
@@ -302,7 +417,7 @@ def edit_course(courseID):
         flash('Course not found!', 'danger')
         return redirect(url_for('admin.view_courses'))
 
-    departments = Department.query.all()
+    departments = cached_departments()
 
     if request.method == 'POST':
         # Extract form data
@@ -310,10 +425,12 @@ def edit_course(courseID):
         course.departmentID = request.form.get('departmentID')
         course.duration = request.form.get('duration')
         course.courseFee = float(request.form.get('courseFee'))
+        course.capacity = int(request.form['capacity']) if request.form.get('capacity') else None
         course.description = request.form.get('description')
 
         try:
             db.session.commit()
+            invalidate(COURSES)
             flash('Course updated successfully!', 'success')
             return redirect(url_for('admin.view_courses'))
         except Exception as e:
@@ -337,6 +454,7 @@ def edit_department(departmentID):
         department.contactInfo = request.form['contactInfo']
         try:
             db.session.commit()
+            invalidate(DEPARTMENTS)
             flash('Department updated successfully!', 'success')
             return redirect(url_for('admin.view_departments'))
         except Exception as e:
@@ -349,9 +467,10 @@ def edit_department(departmentID):
 @admin_required
 def edit_enrollment(enrollmentID):
     enrollment = Enrollment.query.get_or_404(enrollmentID)
-    courses = Course.query.all()
+    courses = cached_courses()
     
     if request.method == 'POST':
+        previous_courseID = enrollment.courseID
         enrollment.courseID = request.form['courseID']
         enrollment.semester = request.form['semester']
         enrollment.status = request.form['status']
@@ -359,7 +478,10 @@ def edit_enrollment(enrollmentID):
         enrollment.paymentStatus = True if request.form.get('paymentStatus') == 'Paid' else False
 
         try:
+            # Admin edits may move or revive enrollments regardless of capacity
+            recount_seats(previous_courseID, enrollment.courseID)
             db.session.commit()
+            invalidate_gradebook(previous_courseID, enrollment.courseID)
             flash('Enrollment updated successfully!', 'success')
             return redirect(url_for('admin.view_enrollments'))
         except Exception as e:
@@ -404,6 +526,9 @@ def edit_user(person_id):
 def delete_student(studID):
     student = Student.query.get(studID)
     db.session.delete(student)
+    # Its attendance summaries go with it through ON DELETE CASCADE
+    db.session.flush()
+    recount_totals()
     db.session.commit()
     flash('Student deleted successfully!', 'success')
     return redirect(url_for('admin.view_students'))
@@ -422,7 +547,11 @@ def delete_professor(profID):
 def delete_course(courseID):
     course = Course.query.get(courseID)
     db.session.delete(course)
+    # Its attendance summaries go with it through ON DELETE CASCADE
+    db.session.flush()
+    recount_totals()
     db.session.commit()
+    invalidate(COURSES)
     flash('Course deleted successfully!', 'success')
     return redirect(url_for('admin.view_courses'))
 
@@ -431,7 +560,11 @@ def delete_course(courseID):
 def delete_department(departmentID):
     department = Department.query.get(departmentID)
     db.session.delete(department)
+    # Its courses' attendance summaries go with them through ON DELETE CASCADE
+    db.session.flush()
+    recount_totals()
     db.session.commit()
+    invalidate(DEPARTMENTS)
     flash('Department deleted successfully!', 'success')
     return redirect(url_for('admin.view_departments'))
 
@@ -442,7 +575,10 @@ def delete_enrollment(enrollmentID):
 
     try:
         db.session.delete(enrollment)
+        db.session.flush()
+        recount_seats(enrollment.courseID)
         db.session.commit()
+        invalidate_gradebook(enrollment.courseID)
         flash('Enrollment deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -461,6 +597,8 @@ def delete_user(person_id):
 
     try:
         db.session.delete(user)
+        db.session.flush()
+        recount_totals()
         db.session.commit()
         flash('User deleted successfully!', 'success')
         return redirect(url_for('admin.view_users'))
@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# Version 1 of the JSON API, registered under /api/v1
+api = Blueprint('api', __name__)
+
+from app.api import routes
@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip
+    brotli = None
+
+# Every successful GET gets a strong ETag: the SHA-256 of the JSON body, with
+# the content coding appended when the body is compressed, since a gzip and a
+# brotli representation are different bytes. A client that sends any of those
+# tags back in If-None-Match gets a bodiless 304 while the data is unchanged.
+
+
+def _negotiate(size):
+    if not current_app.config.get('API_COMPRESSION', True):
+        return None
+    if size < current_app.config.get('API_COMPRESS_MIN_SIZE', 512):
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=current_app.config.get('API_BROTLI_QUALITY', 5))
+    # mtime=0 keeps the gzip bytes identical for identical bodies
+    return gzip.compress(body, compresslevel=current_app.config.get('API_GZIP_LEVEL', 6), mtime=0)
+
+
+def _not_modified(digest):
+    tags = request.if_none_match
+    if tags.star_tag:
+        return True
+    return any(tag.split('-')[0] == digest for tag in tags.as_set(include_weak=True))
+
+
+def finalize(response):
+    """Add the ETag, answer If-None-Match with 304 and compress JSON bodies."""
+    response.vary.add('Accept-Encoding')
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.is_streamed or not response.is_json:
+        return response
+    # Per-user data: browsers may keep it but must revalidate, shared caches may not store it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    body = response.get_data()
+    digest = hashlib.sha256(body).hexdigest()
+    encoding = _negotiate(len(body))
+    etag = f'{digest}-{encoding}' if encoding else digest
+
+    if _not_modified(digest):
+        response.status_code = 304
+        response.set_data(b'')
+        response.headers.pop('Content-Type', None)
+    elif encoding:
+        response.set_data(_compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,219 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from flask import abort, g, jsonify, request, session, url_for
+from werkzeug.exceptions import HTTPException
+from app.api import api
+from app.api import schemas
+from app.api.responses import finalize
+from app.models import (db, Address, Admin, Attendance, Course, Department, Enrollment, Exam, Fee, Grade,
+                        Person, Professor, Student, Submission)
+from app.exports import filter_equal
+from app.pagination import keyset_paginate
+from app.query_budget import query_budget
+from app.sync import SYNCED, changes
+
+
+class Resource:
+    """How one model is exposed: its schema, key, ?sort= and ?<field>= filters, and who may read it.
+
+    Admins read every resource. ``public`` resources are readable without
+    logging in. Otherwise ``owner`` names the column that limits other users
+    to their own rows: 'person_id' for anyone logged in, 'studID' for students.
+    """
+
+    def __init__(self, model, schema, key, sortable=(), filters=(), public=False, owner=None):
+        self.model = model
+        self.schema = schema
+        self.key = key
+        self.sortable = {name: getattr(model, name) for name in sortable}
+        self.filters = filters
+        self.public = public
+        self.owner = owner
+        self.fields = tuple(schema().fields)
+
+
+RESOURCES = {
+    'people': Resource(Person, schemas.PersonSchema, Person.person_id, sortable=('name', 'email'),
+                       filters=('role',), owner='person_id'),
+    'addresses': Resource(Address, schemas.AddressSchema, Address.addressID, filters=('person_id',), owner='person_id'),
+    'students': Resource(Student, schemas.StudentSchema, Student.studID, filters=('person_id',), owner='studID'),
+    'professors': Resource(Professor, schemas.ProfessorSchema, Professor.profID, filters=('department_id',),
+                           owner='person_id'),
+    'admins': Resource(Admin, schemas.AdminSchema, Admin.adminID),
+    'departments': Resource(Department, schemas.DepartmentSchema, Department.departmentID, sortable=('name',),
+                            public=True),
+    'courses': Resource(Course, schemas.CourseSchema, Course.courseID, sortable=('courseName',),
+                        filters=('departmentID',), public=True),
+    'enrollments': Resource(Enrollment, schemas.EnrollmentSchema, Enrollment.enrollmentID,
+                            sortable=('enrollmentDate',), filters=('studID', 'courseID', 'semester', 'status'),
+                            owner='studID'),
+    'attendance': Resource(Attendance, schemas.AttendanceSchema, Attendance.attendanceID, sortable=('date',),
+                           filters=('studID', 'courseID', 'profID'), owner='studID'),
+    'fees': Resource(Fee, schemas.FeeSchema, Fee.feeID, sortable=('dueDate',), filters=('enrollmentID',)),
+    'exams': Resource(Exam, schemas.ExamSchema, Exam.examID, sortable=('date',), filters=('courseID', 'examType')),
+    'submissions': Resource(Submission, schemas.SubmissionSchema, Submission.submissionID,
+                            filters=('examID', 'studID'), owner='studID'),
+    'grades': Resource(Grade, schemas.GradeSchema, Grade.gradeID, filters=('studID', 'courseID', 'examID'),
+                       owner='studID'),
+}
+
+
+@lru_cache(maxsize=256)
+def _schema(schema, only):
+    return schema(only=only, many=True)
+
+
+def _resource(name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        abort(404, description=f"Unknown resource '{name}'.")
+    return resource
+
+
+def _fields(resource):
+    """The ?fields= list (default: every field), validated against the schema."""
+    requested = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    if not requested:
+        return resource.fields
+    unknown = sorted(set(requested) - set(resource.fields))
+    if unknown:
+        abort(400, description=f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(resource.fields)}.")
+    return tuple(dict.fromkeys(requested))
+
+
+def _select(resource, fields, *extra):
+    # Only the requested columns (plus what pagination seeks on); no ORM objects, no eager loads
+    names = dict.fromkeys(fields + tuple(column.key for column in extra))
+    return db.session.query(*(getattr(resource.model, name) for name in names))
+
+
+def _scope(resource, query):
+    role = session.get('user_role')
+    if role == 'Admin' or resource.public:
+        return query
+    if role and resource.owner == 'person_id':
+        return query.filter(resource.model.person_id == session['user_id'])
+    if role == 'Student' and resource.owner == 'studID':
+        if g.get('studID') is None:
+            g.studID = db.session.query(Student.studID).filter_by(person_id=session['user_id']).scalar()
+        return query.filter(resource.model.studID == g.studID)
+    if not role:
+        abort(401, description='Log in to read this resource.')
+    abort(403, description='You may not read this resource.')
+
+
+def _dump(resource, fields, rows):
+    return _schema(resource.schema, fields).dump([row._mapping for row in rows])
+
+
+def _page_url(name, **cursor):
+    args = request.args.to_dict()
+    for arg in ('after', 'before', 'since'):
+        args.pop(arg, None)
+    args.update(cursor)
+    return url_for(request.endpoint, name=name, **args)
+
+
+def _since():
+    value = request.args.get('since')
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, description="'since' must be an ISO 8601 timestamp.")
+    # updatedAt columns hold naive UTC
+    return since.astimezone(timezone.utc).replace(tzinfo=None) if since.tzinfo else since
+
+
+@api.after_request
+def after_request(response):
+    return finalize(response)
+
+
+@api.errorhandler(HTTPException)
+def handle_error(e):
+    return jsonify({'error': {'status': e.code, 'message': e.description}}), e.code
+
+
+@api.route('/', methods=['GET'])
+def index():
+    # What each resource offers, for clients building ?fields=, ?sort= and filter queries
+    return jsonify({
+        'version': 'v1',
+        'resources': {
+            name: {
+                'url': url_for('api.list_resource', name=name),
+                'key': resource.key.key,
+                'fields': list(resource.fields),
+                'sort': [resource.key.key, *resource.sortable],
+                'filters': list(resource.filters),
+                'changes': url_for('api.list_changes', name=name) if resource.model.__tablename__ in SYNCED else None,
+            }
+            for name, resource in RESOURCES.items()
+        },
+    })
+
+
+@api.route('/<name>', methods=['GET'])
+@query_budget(2)
+def list_resource(name):
+    resource = _resource(name)
+    fields = _fields(resource)
+    sort = resource.sortable.get(request.args.get('sort'), resource.key)
+    query = _scope(resource, _select(resource, fields, resource.key, sort))
+    for field in resource.filters:
+        query = filter_equal(query, getattr(resource.model, field), field)
+    page = keyset_paginate(query, resource.key, sortable=resource.sortable)
+    return jsonify({
+        'data': _dump(resource, fields, page),
+        'links': {
+            'next': _page_url(name, after=page.next_cursor) if page.has_next else None,
+            'prev': _page_url(name, before=page.prev_cursor) if page.has_prev else None,
+        },
+        'meta': {'sort': page.sort, 'dir': page.direction, 'per_page': page.per_page, 'count': len(page)},
+    })
+
+
+@api.route('/<name>/<ref>', methods=['GET'])
+@query_budget(2)
+def get_resource(name, ref):
+    resource = _resource(name)
+    fields = _fields(resource)
+    try:
+        ref = resource.key.type.python_type(ref)
+    except ValueError:
+        abort(404, description='No such record.')
+    row = _scope(resource, _select(resource, fields)).filter(resource.key == ref).first()
+    if row is None:
+        abort(404, description='No such record.')
+    return jsonify({'data': _dump(resource, fields, [row])[0]})
+
+
+@api.route('/<name>/changes', methods=['GET'])
+@query_budget(2)
+def list_changes(name):
+    """Rows of ``name`` written since the cursor, and tombstones of the deleted ones, oldest first."""
+    resource = _resource(name)
+    if resource.model.__tablename__ not in SYNCED:
+        abort(404, description=f"'{name}' has no change feed.")
+    role = session.get('user_role')
+    if role != 'Admin':
+        abort(403 if role else 401, description='Change feeds are for admins.')
+    fields = _fields(resource)
+    try:
+        page = changes(resource.model, [getattr(resource.model, field) for field in fields],
+                       cursor=request.args.get('after'), since=_since(), per_page=request.args.get('per_page', type=int))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    rows = iter(_dump(resource, fields, [row for *_, row in page if row is not None]))
+    return jsonify({
+        'data': [
+            {'op': 'delete', 'id': ref, 'at': at.isoformat()} if deleted
+            else {'op': 'upsert', 'id': ref, 'at': at.isoformat(), 'row': next(rows)}
+            for at, deleted, ref, _ in page
+        ],
+        'links': {'next': _page_url(name, after=page.cursor) if page.has_more else None},
+        'meta': {'cursor': page.cursor, 'has_more': page.has_more, 'until': page.until.isoformat(), 'count': len(page)},
+    })
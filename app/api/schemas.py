@@ -0,0 +1,143 @@
+from marshmallow import Schema, fields
+
+# Output schemas for the JSON API. Field names are the model attribute names,
+# so a ?fields= list maps straight onto the columns to select. Secrets and
+# internal storage references (Person.password, Submission.filepath) are left out.
+
+
+class PersonSchema(Schema):
+    person_id = fields.Integer()
+    name = fields.String()
+    role = fields.String()
+    age = fields.Integer()
+    gender = fields.String()
+    phone_no = fields.String()
+    dob = fields.Date()
+    email = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class AddressSchema(Schema):
+    addressID = fields.Integer()
+    person_id = fields.Integer()
+    street = fields.String()
+    city = fields.String()
+    state = fields.String()
+    postal_code = fields.String()
+    country = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class StudentSchema(Schema):
+    studID = fields.String()
+    person_id = fields.Integer()
+    courses = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class ProfessorSchema(Schema):
+    profID = fields.String()
+    person_id = fields.Integer()
+    department_id = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class AdminSchema(Schema):
+    adminID = fields.String()
+    person_id = fields.Integer()
+    role = fields.String()
+    stu_start_date = fields.Date()
+    prof_start_date = fields.Date()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class DepartmentSchema(Schema):
+    departmentID = fields.String()
+    name = fields.String()
+    location = fields.String()
+    contactInfo = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class CourseSchema(Schema):
+    courseID = fields.String()
+    courseName = fields.String()
+    departmentID = fields.String()
+    duration = fields.String()
+    description = fields.String()
+    courseFee = fields.Decimal(as_string=True)
+    capacity = fields.Integer()
+    seatsTaken = fields.Integer()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class EnrollmentSchema(Schema):
+    enrollmentID = fields.Integer()
+    studID = fields.String()
+    courseID = fields.String()
+    status = fields.String()
+    enrollmentDate = fields.DateTime()
+    semester = fields.String()
+    dropDate = fields.DateTime()
+    paymentStatus = fields.Boolean()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class AttendanceSchema(Schema):
+    attendanceID = fields.Integer()
+    studID = fields.String()
+    profID = fields.String()
+    courseID = fields.String()
+    date = fields.DateTime()
+    status = fields.Boolean()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class FeeSchema(Schema):
+    feeID = fields.Integer()
+    enrollmentID = fields.Integer()
+    amount = fields.Decimal(as_string=True)
+    dueDate = fields.DateTime()
+    paymentMethod = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class ExamSchema(Schema):
+    examID = fields.Integer()
+    courseID = fields.String()
+    location = fields.String()
+    date = fields.DateTime()
+    examType = fields.String()
+    duration = fields.Integer()
+    maxMarks = fields.Float()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
+
+
+class SubmissionSchema(Schema):
+    submissionID = fields.Integer()
+    examID = fields.Integer()
+    studID = fields.String()
+    submittedat = fields.DateTime()
+
+
+class GradeSchema(Schema):
+    gradeID = fields.Integer()
+    courseID = fields.String()
+    studID = fields.String()
+    examID = fields.Integer()
+    grade = fields.Float()
+    gradeCategory = fields.String()
+    feedback = fields.String()
+    createdAt = fields.DateTime()
+    updatedAt = fields.DateTime()
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from flask import current_app, request
+from flask.helpers import get_debug_flag
+
+try:
+    import brotli
+except ImportError:  # optional; assets are pre-compressed with gzip only
+    brotli = None
+
+# Static files are read once at startup and served under content-hashed names
+# (styles.css -> styles.1a2b3c4d5e6f.css): url_for('static', ...) returns the
+# hashed name, and responses for it are cached for ASSETS_MAX_AGE as immutable,
+# so browsers never revalidate them. Editing a file changes its name, which is
+# what busts the cache. Text assets are compressed ahead of time.
+
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{12}(?P<ext>\.[^./]+)$')
+
+
+class Asset:
+    """One static file: its fingerprinted name and its identity, gzip and brotli bodies."""
+
+    def __init__(self, filename, data):
+        digest = hashlib.sha256(data).hexdigest()
+        stem, ext = os.path.splitext(filename)
+        self.filename = filename
+        self.fingerprinted = f'{stem}.{digest[:12]}{ext}'
+        self.digest = digest
+        self.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.bodies = {'identity': data}
+        if self.mimetype.startswith(COMPRESSIBLE):
+            compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(data, quality=11)
+            # Tiny files can grow when compressed; keep only encodings that save bytes
+            self.bodies.update((encoding, body) for encoding, body in compressed.items() if len(body) < len(data))
+
+    def encoding_for(self, accepted):
+        """The smallest body the client accepts."""
+        for encoding in sorted(self.bodies, key=lambda encoding: len(self.bodies[encoding])):
+            if encoding == 'identity' or accepted[encoding]:
+                return encoding
+
+
+class Manifest:
+    """Every file under a static folder, by original and by fingerprinted name."""
+
+    def __init__(self, root):
+        self.by_filename = {}
+        self.by_fingerprint = {}
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(directory, name)
+                filename = os.path.relpath(path, root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    asset = Asset(filename, f.read())
+                self.by_filename[filename] = asset
+                self.by_fingerprint[asset.fingerprinted] = asset
+
+
+def get_manifest():
+    return current_app.extensions.get('assets')
+
+
+def _fingerprint_url(endpoint, values):
+    # url_for('static', filename='styles.css') -> /static/styles.<hash>.css
+    if endpoint == 'static' and 'filename' in values:
+        asset = get_manifest().by_filename.get(values['filename'])
+        if asset is not None:
+            values['filename'] = asset.fingerprinted
+
+
+def serve_static(filename):
+    """Serve a fingerprinted asset from memory; anything else as Flask would."""
+    manifest = get_manifest()
+    asset = manifest.by_fingerprint.get(filename)
+    if asset is None:
+        # A page cached across a deploy may ask for an old fingerprint: serve the
+        # current file under Flask's default caching rather than a 404
+        match = _FINGERPRINTED.match(filename)
+        if match and match['stem'] + match['ext'] in manifest.by_filename:
+            filename = match['stem'] + match['ext']
+        return current_app.send_static_file(filename)
+
+    encoding = asset.encoding_for(request.accept_encodings)
+    response = current_app.response_class(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(asset.digest if encoding == 'identity' else f'{asset.digest}-{encoding}')
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('ASSETS_MAX_AGE', 31536000)
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """Fingerprint the static folder; on by default except in debug mode, where files change under a running app."""
+    enabled = app.config.get('ASSETS_FINGERPRINT')
+    if enabled is None:
+        enabled = not (app.debug or get_debug_flag())
+    if not enabled or not app.static_folder or not os.path.isdir(app.static_folder):
+        return
+    manifest = Manifest(app.static_folder)
+    app.extensions['assets'] = manifest
+    app.url_defaults(_fingerprint_url)
+    app.view_functions['static'] = serve_static
+    app.logger.info('Fingerprinted %d static files', len(manifest.by_filename))
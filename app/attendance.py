@@ -0,0 +1,161 @@
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, func, select, update
+from app import db
+from app.models import Attendance, AttendanceSummary, AttendanceTotals, Course
+from app.upsert import upsert
+
+# Columns that identify one attendance mark; backed by uq_attendance_student_course_date
+ATTENDANCE_KEY = ('studID', 'courseID', 'date')
+
+# Rows per statement; keeps bind parameters under driver limits for huge sections
+BATCH_SIZE = 1000
+
+# Primary key of the single AttendanceTotals row
+UNIVERSITY = 1
+
+
+def _upsert(rows):
+    """Build one multi-row INSERT that updates the mark when the key already exists."""
+    return upsert(Attendance.__table__, ATTENDANCE_KEY, ('status', 'profID', 'updatedAt'), rows=rows)
+
+
+def _pairs(model, courseID, studIDs):
+    conditions = []
+    if courseID is not None:
+        conditions.append(model.courseID == courseID)
+    if studIDs is not None:
+        conditions.append(model.studID.in_(list(studIDs)))
+    return conditions
+
+
+def _adjust_totals(sign, conditions):
+    """Add (sign=1) or subtract (sign=-1) the matching summaries to the totals row; returns rows updated."""
+    def summed(column):
+        return select(func.coalesce(func.sum(column), 0)).where(*conditions).scalar_subquery()
+
+    return db.session.execute(
+        update(AttendanceTotals)
+        .where(AttendanceTotals.totalsID == UNIVERSITY)
+        .values(
+            totalClasses=AttendanceTotals.totalClasses + sign * summed(AttendanceSummary.totalClasses),
+            attendedClasses=AttendanceTotals.attendedClasses + sign * summed(AttendanceSummary.attendedClasses),
+            updatedAt=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def recount_totals():
+    """Set AttendanceTotals from every summary (after deletes cascade into AttendanceSummary, and for repairs)."""
+    total, attended = db.session.query(
+        func.coalesce(func.sum(AttendanceSummary.totalClasses), 0),
+        func.coalesce(func.sum(AttendanceSummary.attendedClasses), 0),
+    ).one()
+    row = {'totalsID': UNIVERSITY, 'totalClasses': total, 'attendedClasses': attended, 'updatedAt': datetime.utcnow()}
+    db.session.execute(upsert(
+        AttendanceTotals.__table__, ('totalsID',), ('totalClasses', 'attendedClasses', 'updatedAt'), rows=[row],
+    ))
+
+
+def refresh_summaries(courseID=None, studIDs=None):
+    """Recompute AttendanceSummary rows from Attendance for the given course/students.
+
+    Only the (studID, courseID) pairs touched by a write are re-aggregated, in a
+    single INSERT ... SELECT, so the cost follows the size of the write rather
+    than the size of the Attendance table. With no arguments every pair is rebuilt.
+    AttendanceTotals moves by the difference: the old sums of those pairs come
+    off before the rebuild and the new ones go on after it. The first UPDATE
+    also locks the totals row, which serialises concurrent writers around it.
+    """
+    pairs = _pairs(AttendanceSummary, courseID, studIDs)
+    counted = _adjust_totals(-1, pairs)
+
+    aggregate = (
+        select(
+            Attendance.studID,
+            Attendance.courseID,
+            func.count(),
+            func.sum(case((Attendance.status == True, 1), else_=0)),
+            func.max(Attendance.date),
+            func.max(Attendance.updatedAt),
+        )
+        .where(*_pairs(Attendance, courseID, studIDs))
+        .group_by(Attendance.studID, Attendance.courseID)
+    )
+    columns = ('studID', 'courseID', 'totalClasses', 'attendedClasses', 'lastDate', 'updatedAt')
+    db.session.execute(upsert(
+        AttendanceSummary.__table__, ('studID', 'courseID'), columns[2:],
+        select=aggregate, columns=columns,
+    ))
+
+    if counted:
+        _adjust_totals(1, pairs)
+    else:
+        # No totals row yet (a database created from the models): start it from the summaries
+        recount_totals()
+
+
+def mark_attendance(courseID, profID, date, statuses):
+    """Record attendance for a whole class in one statement per ``BATCH_SIZE`` students.
+
+    ``statuses`` maps studID to True/False. Marking the same course and date
+    again overwrites the earlier marks instead of adding rows, so a resubmitted
+    form is harmless. The per-student summaries are refreshed in the same
+    transaction. The caller owns the transaction.
+    """
+    if not statuses:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'studID': studID,
+            'profID': profID,
+            'courseID': courseID,
+            'date': date,
+            'status': bool(status),
+            'createdAt': now,
+            'updatedAt': now,
+        }
+        for studID, status in statuses.items()
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        db.session.execute(_upsert(batch))
+        refresh_summaries(courseID, [row['studID'] for row in batch])
+    return len(rows)
+
+
+def student_summary(studID, courseID):
+    """Attendance totals for one student in one course (primary-key lookup)."""
+    return db.session.get(AttendanceSummary, (studID, courseID))
+
+
+def course_summaries(courseID):
+    """Summaries for every student in a course, keyed by studID."""
+    summaries = AttendanceSummary.query.filter_by(courseID=courseID).all()
+    return {summary.studID: summary for summary in summaries}
+
+
+def university_totals():
+    """The AttendanceTotals row (primary-key lookup); None until attendance is first written."""
+    return db.session.get(AttendanceTotals, UNIVERSITY)
+
+
+attendance_cli = AppGroup('attendance', help='Attendance maintenance commands.')
+
+
+@attendance_cli.command('backfill-summary')
+@click.option('--course', 'courseID', default=None, help='Only rebuild summaries for this course.')
+def backfill_summary(courseID):
+    """Build AttendanceSummary from existing Attendance rows, one course per transaction."""
+    courseIDs = [courseID] if courseID else [c.courseID for c in db.session.query(Course.courseID)]
+    for current in courseIDs:
+        refresh_summaries(current)
+        db.session.commit()
+        click.echo(f'Refreshed attendance summaries for {current}')
+    recount_totals()
+    db.session.commit()
+    click.echo('Recounted university attendance totals')
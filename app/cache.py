@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session
+from app.replicas import use_primary
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with an optional per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=_MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+            }
+
+
+class MemoryVersionStore:
+    """Namespace version counters kept in this process.
+
+    Stand-in for a shared store: with a single worker (or in tests) it behaves
+    exactly like the Redis store, but other processes will not see its bumps.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+
+class RedisVersionStore:
+    """Namespace version counters shared by every worker through Redis."""
+
+    def __init__(self, url, prefix='ums:cache-version:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('CACHE_SHARED_BACKEND points at Redis but the redis package is not installed.') from e
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, namespace):
+        value = self._client.get(self._prefix + namespace)
+        return int(value) if value is not None else 0
+
+    def bump(self, namespace):
+        return int(self._client.incr(self._prefix + namespace))
+
+
+class VersionedCache:
+    """Read-through cache whose keys embed a per-namespace version.
+
+    Invalidating a namespace bumps its version in the version store, so every
+    worker sharing that store misses on its next read and reloads, while stale
+    entries simply age out of the local LRU.
+    """
+
+    def __init__(self, local, versions):
+        self.local = local
+        self.versions = versions
+
+    def version(self, namespace):
+        return self.versions.get(namespace)
+
+    def get_or_load(self, namespace, key, loader, ttl=_MISSING):
+        cache_key = (namespace, self.versions.get(namespace), key)
+        value = self.local.get(cache_key, _MISSING)
+        if value is _MISSING:
+            # Fill from the primary so a lagging replica is never cached past an invalidation
+            with use_primary():
+                value = loader()
+            self.local.set(cache_key, value, ttl)
+        return value
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.versions.bump(namespace)
+
+    def render_metrics(self):
+        """Hit/miss counters in the Prometheus text format used by app.metrics."""
+        stats = self.local.stats()
+        lines = []
+        for name, kind, value in (
+            ('ums_cache_hits_total', 'counter', stats['hits']),
+            ('ums_cache_misses_total', 'counter', stats['misses']),
+            ('ums_cache_evictions_total', 'counter', stats['evictions']),
+            ('ums_cache_entries', 'gauge', stats['size']),
+        ):
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _version_store(backend):
+    if not backend or backend == 'memory':
+        return MemoryVersionStore()
+    if backend.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisVersionStore(backend)
+    raise ValueError(f'Unsupported CACHE_SHARED_BACKEND: {backend}')
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def invalidate(*namespaces):
+    get_cache().invalidate(*namespaces)
+
+
+def cached_page(*namespaces, ttl=_MISSING):
+    """Cache the rendered HTML of an anonymous GET view.
+
+    The cache key carries the current version of every namespace the page is
+    built from, so invalidating one of them re-renders the page on the next hit.
+    Logged-in users and requests with pending flash messages always render fresh,
+    since the navbar and alerts in base.html depend on the session.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET' or 'user_id' in session or '_flashes' in session:
+                return f(*args, **kwargs)
+
+            cache = get_cache()
+            key = (request.path, tuple(cache.version(namespace) for namespace in namespaces))
+            html = cache.local.get(('pages', key))
+            if html is None:
+                with use_primary():
+                    html = f(*args, **kwargs)
+                if not isinstance(html, str):
+                    return html
+                cache.local.set(('pages', key), html, ttl)
+            return html
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    app.extensions['cache'] = VersionedCache(
+        LRUCache(maxsize=app.config.get('CACHE_MAXSIZE', 1024), ttl=app.config.get('CACHE_TTL')),
+        _version_store(app.config.get('CACHE_SHARED_BACKEND')),
+    )
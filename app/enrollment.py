@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, or_, select, update
+from app import db
+from app.models import Course, Enrollment, Fee
+
+# Every status except Dropped occupies a seat, including Pending Payment
+SEAT_FREE_STATUS = 'Dropped'
+
+
+class CourseFull(Exception):
+    pass
+
+
+def reserve_seat(courseID):
+    """Take one seat in ``courseID``; returns False when the course is full.
+
+    A single conditional UPDATE checks and increments the counter, so the
+    database's row lock on the Course row serialises concurrent enrollers and
+    a seat can never be handed out twice. The lock is held until the caller's
+    transaction ends; commit promptly.
+    """
+    result = db.session.execute(
+        update(Course)
+        .where(Course.courseID == courseID)
+        .where(or_(Course.capacity.is_(None), Course.seatsTaken < Course.capacity))
+        .values(seatsTaken=Course.seatsTaken + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_seat(courseID):
+    db.session.execute(
+        update(Course)
+        .where(Course.courseID == courseID, Course.seatsTaken > 0)
+        .values(seatsTaken=Course.seatsTaken - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recount_seats(*courseIDs):
+    """Set seatsTaken from the Enrollment rows themselves (for admin edits and repairs)."""
+    taken = (
+        select(func.count())
+        .where(Enrollment.courseID == Course.courseID, Enrollment.status != SEAT_FREE_STATUS)
+        .scalar_subquery()
+    )
+    statement = update(Course).values(seatsTaken=taken).execution_options(synchronize_session=False)
+    if courseIDs:
+        statement = statement.where(Course.courseID.in_(courseIDs))
+    db.session.execute(statement)
+
+
+def enroll_student(studID, courseID, semester):
+    """Enroll a student, reserving a seat in the same transaction.
+
+    Enrolling again in the same course and semester returns the existing
+    enrollment; a dropped one is reopened. Raises CourseFull when no seat is
+    left. A concurrent duplicate surfaces as IntegrityError on flush, which
+    rolls the seat back with it. The caller owns the transaction.
+    """
+    enrollment = Enrollment.query.filter_by(studID=studID, courseID=courseID, semester=semester).first()
+    if enrollment and enrollment.status != SEAT_FREE_STATUS:
+        return enrollment
+
+    if not reserve_seat(courseID):
+        raise CourseFull(courseID)
+
+    if enrollment:
+        enrollment.status = 'Pending Payment'
+        enrollment.dropDate = None
+        enrollment.enrollmentDate = datetime.utcnow()
+    else:
+        enrollment = Enrollment(
+            studID=studID,
+            courseID=courseID,
+            status='Pending Payment',
+            enrollmentDate=datetime.utcnow(),
+            semester=semester,
+            paymentStatus=False,
+        )
+        db.session.add(enrollment)
+    db.session.flush()
+    return enrollment
+
+
+def pay_enrollment(enrollment, amount, paymentMethod):
+    """Mark ``enrollment`` paid and record its Fee, at most once.
+
+    The paid flag is flipped with a conditional UPDATE, so of two concurrent
+    payments only one sees a row change and writes a Fee. Returns False if the
+    enrollment was already paid. The caller owns the transaction.
+    """
+    result = db.session.execute(
+        update(Enrollment)
+        .where(Enrollment.enrollmentID == enrollment.enrollmentID)
+        .where(or_(Enrollment.paymentStatus.is_(None), Enrollment.paymentStatus == False))
+        .values(paymentStatus=True, status='Active', updatedAt=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+
+    db.session.add(Fee(
+        enrollmentID=enrollment.enrollmentID,
+        amount=amount,
+        dueDate=datetime.utcnow() + timedelta(days=7),
+        paymentMethod=paymentMethod,
+    ))
+    return True
+
+
+def drop_enrollment(enrollment):
+    """Drop ``enrollment`` and give its seat back. The caller owns the transaction."""
+    if enrollment.status == SEAT_FREE_STATUS:
+        return
+    enrollment.status = SEAT_FREE_STATUS
+    enrollment.dropDate = datetime.utcnow()
+    release_seat(enrollment.courseID)
+
+
+enrollment_cli = AppGroup('enrollment', help='Enrollment maintenance commands.')
+
+
+@enrollment_cli.command('recount-seats')
+@click.option('--course', 'courseID', default=None, help='Only recount this course.')
+def recount_seats_command(courseID):
+    """Rebuild Course.seatsTaken from Enrollment rows."""
+    if courseID:
+        recount_seats(courseID)
+    else:
+        recount_seats()
+    db.session.commit()
+    click.echo('Recounted course seats.')
@@ -0,0 +1,87 @@
+import numpy as np
+from app import db
+from app.cache import get_cache, invalidate
+from app.models import Grade
+
+PERCENTILES = (10, 25, 75, 90)
+HISTOGRAM_BINS = 10
+
+
+def namespace(examID):
+    """Cache namespace of one exam's statistics."""
+    return f'exam-stats:{examID}'
+
+
+def invalidate_exam_stats(*examIDs):
+    """Drop cached statistics; call after committing grade or exam changes."""
+    invalidate(*(namespace(examID) for examID in examIDs))
+
+
+class ExamStatistics:
+    """Summary of one exam's grades.
+
+    ``percentiles`` maps each of PERCENTILES to a mark and ``histogram`` is a
+    list of (low, high, count) over HISTOGRAM_BINS equal bins from 0 to
+    maxMarks, the last bin including maxMarks itself. Everything but ``count``
+    and ``histogram`` is None when nobody has been graded.
+    """
+
+    def __init__(self, examID, maxMarks, count, mean, median, std, minimum, maximum, percentiles, histogram):
+        self.examID = examID
+        self.maxMarks = maxMarks
+        self.count = count
+        self.mean = mean
+        self.median = median
+        self.std = std
+        self.minimum = minimum
+        self.maximum = maximum
+        self.percentiles = percentiles
+        self.histogram = histogram
+
+
+def _bin_edges(maxMarks):
+    return [maxMarks * i / HISTOGRAM_BINS for i in range(HISTOGRAM_BINS + 1)]
+
+
+def _summarise(grades, maxMarks):
+    values = np.asarray(grades, dtype=float)
+    # Clip so grades left above a lowered maxMarks land in the top bin
+    counts, _ = np.histogram(np.clip(values, 0.0, maxMarks), bins=HISTOGRAM_BINS, range=(0.0, maxMarks or 1.0))
+    return (
+        float(values.mean()), float(np.median(values)), float(values.std()),
+        dict(zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist())),
+        counts.tolist(),
+    )
+
+
+def summarise(examID, maxMarks, grades):
+    """ExamStatistics for an ascending list of grades."""
+    edges = _bin_edges(maxMarks)
+    if not grades:
+        histogram = [(edges[i], edges[i + 1], 0) for i in range(HISTOGRAM_BINS)]
+        return ExamStatistics(examID, maxMarks, 0, None, None, None, None, None, None, histogram)
+
+    mean, median, std, percentiles, counts = _summarise(grades, maxMarks)
+    histogram = [(edges[i], edges[i + 1], counts[i]) for i in range(HISTOGRAM_BINS)]
+    return ExamStatistics(
+        examID, maxMarks, len(grades), round(mean, 2), round(median, 2), round(std, 2),
+        grades[0], grades[-1], {q: round(value, 2) for q, value in percentiles.items()}, histogram,
+    )
+
+
+def _load(exam):
+    grades = [
+        grade for (grade,) in
+        db.session.query(Grade.grade).filter(Grade.examID == exam.examID).order_by(Grade.grade)
+    ]
+    return summarise(exam.examID, exam.maxMarks, grades)
+
+
+def exam_statistics(exam):
+    """Statistics for ``exam``, read with one query and cached per examID until invalidated."""
+    return get_cache().get_or_load(namespace(exam.examID), 'stats', lambda: _load(exam))
+
+
+def course_statistics(exams):
+    """[(exam, ExamStatistics), ...] for a course's exams, each served from its own cache entry."""
+    return [(exam, exam_statistics(exam)) for exam in exams]
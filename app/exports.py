@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import Response, abort, request, stream_with_context
+from app.pagination import iter_keyset
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per query while streaming, and rows written per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _parse_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400, description=f"'{name}' must be a date in YYYY-MM-DD format.")
+
+
+def filter_date_range(query, column):
+    """Apply ``?from=`` / ``?to=`` (inclusive, YYYY-MM-DD) to ``column``."""
+    start = _parse_date('from')
+    end = _parse_date('to')
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end + timedelta(days=1))
+    return query
+
+
+def filter_equal(query, column, arg):
+    """Apply ``?<arg>=value`` as an equality filter on ``column`` when present."""
+    value = request.args.get(arg)
+    if value:
+        query = query.filter(column == value)
+    return query
+
+
+def _chunks(rows, fields, fmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(fields)
+
+    pending = 0
+    for row in rows:
+        values = [getattr(row, field) for field in fields]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, map(_jsonable, values)))) + '\n')
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def stream_export(query, key, fields, filename):
+    """Stream ``query`` as CSV or NDJSON (``?format=``) without materialising it.
+
+    ``fields`` are attribute names read from each row, in output order.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400, description=f"Unsupported export format '{fmt}'.")
+
+    rows = iter_keyset(query, key, EXPORT_BATCH_SIZE)
+    response = Response(stream_with_context(_chunks(rows, fields, fmt)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
@@ -0,0 +1,122 @@
+import numpy as np
+from flask import current_app
+from sqlalchemy import or_
+from app import db
+from app.cache import get_cache, invalidate
+from app.models import Enrollment, Exam, Grade, Person, Student
+
+# Share of the final mark carried by each exam type. Within a type, exams count
+# in proportion to their maxMarks. Overridden by GRADEBOOK_TYPE_WEIGHTS.
+DEFAULT_TYPE_WEIGHTS = {'Assignment': 0.4, 'Written': 0.6}
+
+
+def namespace(courseID):
+    """Cache namespace of one course's gradebook."""
+    return f'gradebook:{courseID}'
+
+
+def invalidate_gradebook(*courseIDs):
+    """Drop cached gradebooks; call after committing grade, exam or roster changes."""
+    invalidate(*(namespace(courseID) for courseID in courseIDs))
+
+
+class Gradebook:
+    """Every student's marks for every exam of a course, plus weighted finals.
+
+    ``exams`` is a list of (examID, examType, maxMarks, date) and ``rows`` a list
+    of (studID, name, marks, final) where ``marks`` lines up with ``exams`` (None
+    where a student has no grade) and ``final`` is a percentage, or None while
+    nothing in the course has been marked.
+    """
+
+    def __init__(self, courseID, exams, rows, weights):
+        self.courseID = courseID
+        self.exams = exams
+        self.rows = rows
+        self.weights = weights
+        self._by_student = {row[0]: row for row in rows}
+
+    def row(self, studID):
+        return self._by_student.get(studID)
+
+
+def _exam_weights(types, max_marks, graded, type_weights):
+    """Weight of one mark point per exam, such that marks @ weights is the final percentage.
+
+    Exams nobody has been graded on yet are left out; the type weights of the
+    remaining types are renormalised to sum to 1.
+    """
+    totals = {}
+    for examType, maximum, done in zip(types, max_marks, graded):
+        if done:
+            totals[examType] = totals.get(examType, 0.0) + maximum
+    share = sum(type_weights.get(examType, 0.0) for examType in totals)
+    if not share:
+        return None
+    return [
+        100.0 * type_weights.get(examType, 0.0) / share / totals[examType] if done else 0.0
+        for examType, done in zip(types, graded)
+    ]
+
+
+def compute_finals(matrix, types, max_marks, type_weights):
+    """Weighted final percentages for a students x exams matrix of marks (None = missing).
+
+    Returns (finals, per-exam weights).
+    """
+    # None becomes NaN
+    scores = np.array(matrix, dtype=float).reshape(len(matrix), len(types))
+    graded = ~np.all(np.isnan(scores), axis=0) if len(matrix) else np.zeros(len(types), dtype=bool)
+    weights = _exam_weights(types, max_marks, graded.tolist(), type_weights)
+    if weights is None:
+        return [None] * len(matrix), None
+    # A missing grade on a marked exam counts as zero
+    finals = np.nan_to_num(scores, nan=0.0) @ np.array(weights)
+    return np.round(finals, 2).tolist(), weights
+
+
+def _load(courseID):
+    # Every exam of the course with all of its grades, in one query
+    marks = (
+        db.session.query(Exam.examID, Exam.examType, Exam.maxMarks, Exam.date, Grade.studID, Grade.grade)
+        .outerjoin(Grade, Grade.examID == Exam.examID)
+        .filter(Exam.courseID == courseID)
+        .order_by(Exam.date, Exam.examID)
+        .all()
+    )
+    exams, columns, grades = [], {}, {}
+    for examID, examType, maxMarks, date, studID, grade in marks:
+        if examID not in columns:
+            columns[examID] = len(exams)
+            exams.append((examID, examType, maxMarks, date))
+        if studID is not None:
+            grades[studID, columns[examID]] = grade
+
+    # Active students plus anyone who already holds a grade in the course
+    graded = {studID for studID, _ in grades}
+    active = db.session.query(Enrollment.studID).filter(
+        Enrollment.courseID == courseID, Enrollment.status == 'Active'
+    )
+    students = (
+        db.session.query(Student.studID, Person.name)
+        .join(Person, Student.person_id == Person.person_id)
+        .filter(or_(Student.studID.in_(active), Student.studID.in_(list(graded))))
+        .order_by(Student.studID)
+        .all()
+    )
+
+    matrix = [[grades.get((studID, j)) for j in range(len(exams))] for studID, _ in students]
+    type_weights = current_app.config.get('GRADEBOOK_TYPE_WEIGHTS') or DEFAULT_TYPE_WEIGHTS
+    finals, weights = compute_finals(
+        matrix, [exam[1] for exam in exams], [exam[2] for exam in exams], type_weights
+    )
+    rows = [
+        (studID, name, marks, final)
+        for (studID, name), marks, final in zip(students, matrix, finals)
+    ]
+    return Gradebook(courseID, exams, rows, weights)
+
+
+def course_gradebook(courseID):
+    """The course's Gradebook, built in two queries and cached until invalidated."""
+    return get_cache().get_or_load(namespace(courseID), 'gradebook', lambda: _load(courseID))
@@ -0,0 +1,109 @@
+import csv
+import io
+import math
+from datetime import datetime
+from app import db
+from app.exam_stats import invalidate_exam_stats
+from app.gradebook import invalidate_gradebook
+from app.models import Enrollment, Grade, Submission
+from app.upsert import upsert
+
+# Exam.examType -> Grade.gradeCategory
+GRADE_CATEGORIES = {'Assignment': 'Assignment', 'Written': 'Exam'}
+
+# Columns that identify one grade; backed by uq_grade_student_exam
+GRADE_KEY = ('studID', 'examID')
+
+
+def parse_grade_csv(stream):
+    """Read (line, studID, grade, feedback) entries from a CSV with studID,grade[,feedback]."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or not {'studID', 'grade'} <= set(reader.fieldnames):
+        raise ValueError('CSV must have studID and grade columns.')
+    return [
+        (line, (row.get('studID') or '').strip(), (row.get('grade') or '').strip(), row.get('feedback'))
+        for line, row in enumerate(reader, start=2)
+    ]
+
+
+def gradable_students(exam):
+    """studIDs that may be graded for ``exam``: submitters plus students enrolled in its course."""
+    submitted = db.session.query(Submission.studID).filter(Submission.examID == exam.examID)
+    enrolled = db.session.query(Enrollment.studID).filter(
+        Enrollment.courseID == exam.courseID, Enrollment.status == 'Active'
+    )
+    return {studID for (studID,) in submitted.union(enrolled)}
+
+
+def validate_grades(exam, entries):
+    """Check (label, studID, grade, feedback) entries against the exam; label may be None.
+
+    Returns ({studID: (grade, feedback)}, [(label, message), ...]). Blank grades
+    are skipped; a later entry for the same student replaces an earlier one.
+    Feedback stays None when the entry has none (keep the current feedback) and
+    becomes '' when it was given blank (clear it).
+    """
+    allowed = gradable_students(exam)
+    valid, errors = {}, []
+    for label, studID, raw_grade, feedback in entries:
+        if raw_grade in (None, ''):
+            continue
+        try:
+            value = float(raw_grade)
+        except ValueError:
+            errors.append((label, f'{studID}: grade {raw_grade!r} is not a number'))
+            continue
+        if not 0 <= value <= exam.maxMarks:
+            errors.append((label, f'{studID}: grade {value:g} is outside 0-{exam.maxMarks:g}'))
+        elif studID not in allowed:
+            errors.append((label, f'{studID}: not enrolled in {exam.courseID} and no submission'))
+        else:
+            valid[studID] = (value, feedback.strip() if feedback is not None else None)
+    return valid, errors
+
+
+def record_grades(exam, grades):
+    """Upsert ``{studID: (grade, feedback)}`` for ``exam`` with one INSERT; returns the rows written.
+
+    A None feedback keeps whatever feedback the student already has and an
+    empty one clears it. Entries that would leave a grade as it is are not
+    written, so resubmitting a prefilled form does not touch updatedAt (or the
+    change feed). The caller owns the transaction.
+    """
+    if not grades:
+        return 0
+
+    current = {
+        studID: (grade, feedback)
+        for studID, grade, feedback in db.session.query(Grade.studID, Grade.grade, Grade.feedback)
+        .filter(Grade.examID == exam.examID, Grade.studID.in_(list(grades)))
+        .with_for_update()
+    }
+    now = datetime.utcnow()
+    rows = []
+    for studID, (value, feedback) in grades.items():
+        old_grade, old_feedback = current.get(studID, (None, None))
+        feedback = old_feedback if feedback is None else feedback or None
+        # Grade is a single-precision FLOAT on MySQL, so compare the marks loosely
+        if studID in current and feedback == old_feedback and math.isclose(value, old_grade, rel_tol=1e-6):
+            continue
+        rows.append({
+            'courseID': exam.courseID,
+            'studID': studID,
+            'examID': exam.examID,
+            'grade': value,
+            'gradeCategory': GRADE_CATEGORIES.get(exam.examType, 'Exam'),
+            'feedback': feedback,
+            'createdAt': now,
+            'updatedAt': now,
+        })
+    if rows:
+        db.session.execute(upsert(Grade.__table__, GRADE_KEY, ('grade', 'feedback', 'updatedAt'), rows=rows))
+    return len(rows)
+
+
+def grades_changed(exam):
+    """Invalidate everything derived from ``exam``'s grades; call after committing."""
+    invalidate_exam_stats(exam.examID)
+    invalidate_gradebook(exam.courseID)
@@ -0,0 +1,93 @@
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+import click
+from flask import current_app, flash, redirect, request, session
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import IdempotencyKey
+
+FORM_FIELD = 'idempotency_key'
+
+
+def new_key():
+    """A fresh key for a form; templates render it into a hidden FORM_FIELD input."""
+    return uuid.uuid4().hex
+
+
+def _forget(key):
+    IdempotencyKey.query.filter_by(key=key).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _replay(record):
+    if record.person_id != session.get('user_id') or record.endpoint != request.endpoint:
+        flash('This form has expired. Please try again.', 'warning')
+        return redirect(request.url)
+    if record.location is None:
+        flash('Your request is already being processed.', 'info')
+        return redirect(request.url)
+    flash('Your request was already processed.', 'info')
+    return redirect(record.location)
+
+
+def idempotent(f):
+    """Run a form POST at most once per idempotency key.
+
+    The key is claimed by inserting it before the view runs, so a double-click
+    or a retried submit racing the first one fails on the primary key and is
+    redirected to where the first request went instead of repeating its
+    writes. Only redirects are remembered; if the view renders a page or
+    raises, the key is released so the form can be submitted again. POSTs
+    without a key run as before.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.form.get(FORM_FIELD) if request.method == 'POST' else None
+        if not key:
+            return f(*args, **kwargs)
+        key = key[:64]
+
+        record = db.session.get(IdempotencyKey, key)
+        if record is None:
+            db.session.add(IdempotencyKey(key=key, person_id=session.get('user_id'), endpoint=request.endpoint))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                record = db.session.get(IdempotencyKey, key)
+        if record is not None:
+            return _replay(record)
+
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            _forget(key)
+            raise
+
+        if 300 <= response.status_code < 400 and response.location:
+            IdempotencyKey.query.filter_by(key=key).update({'location': response.location[:500]})
+            db.session.commit()
+        else:
+            _forget(key)
+        return response
+    return decorated_function
+
+
+def init_app(app):
+    app.jinja_env.globals['idempotency_key'] = new_key
+
+
+idempotency_cli = AppGroup('idempotency', help='Idempotency key maintenance.')
+
+
+@idempotency_cli.command('purge')
+@click.option('--hours', default=24, show_default=True, help='Delete keys older than this.')
+def purge_command(hours):
+    """Delete old idempotency keys."""
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.createdAt < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'Deleted {deleted} idempotency keys.')
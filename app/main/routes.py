@@ -1,23 +1,33 @@
 import re
-from datetime import datetime, timedelta
-from flask import render_template, request, redirect, url_for, flash, session
+from flask import render_template, request, redirect, url_for, flash, session, current_app
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.main import main
-from app.models import db, Person, Professor, Student, Address, Course, Enrollment, Fee
+from app.models import db, Person, Professor, Student, Address, Course, Enrollment
+from app.passwords import PASSWORD_PATTERN, PasswordHasherBusy
+from app.cache import cached_page
+from app.reference_data import COURSES, courses as cached_courses
+from app.gradebook import invalidate_gradebook
+from app.enrollment import CourseFull, enroll_student, pay_enrollment
+from app.idempotency import idempotent
 
 @main.route('/')
+@cached_page()
 def index():
     return render_template('index.html')
 
 @main.route('/about')
+@cached_page()
 def about():
     return render_template('about.html')
 
 @main.route('/courses', methods=['GET'])
+@cached_page(COURSES)
 def courses():
-    courses = Course.query.all()
+    courses = cached_courses()
     return render_template('courses.html', courses=courses)
 
 @main.route('/enroll/<string:courseID>', methods=['GET', 'POST'])
+@idempotent
 def enroll(courseID):
     if 'user_id' not in session:
         flash('You need to be logged in to enroll in a course.', 'warning')
@@ -46,30 +56,36 @@ def enroll(courseID):
     if request.method == 'POST':
         semester = request.form.get('semester')
 
-        # Create Enrollment record
-        enrollment = Enrollment(
-            studID=student.studID,
-            courseID=courseID,
-            status="Pending Payment",
-            enrollmentDate=datetime.utcnow(),
-            semester=semester,
-            paymentStatus=False
-        )
-
         try:
-            db.session.add(enrollment)
+            enrollment = enroll_student(student.studID, courseID, semester)
             db.session.commit()
-            flash(f'Enrollment initiated for {course.courseName}. Please proceed to payment.', 'success')
-            return redirect(url_for('main.payment', enrollmentID=enrollment.enrollmentID))
+        except CourseFull:
+            db.session.rollback()
+            flash(f'{course.courseName} is full. No seats are left.', 'danger')
+            return redirect(url_for('main.courses'))
+        except IntegrityError:
+            # A concurrent request enrolled the same student first; use that enrollment
+            db.session.rollback()
+            enrollment = Enrollment.query.filter_by(studID=student.studID, courseID=courseID, semester=semester).first()
+            if not enrollment:
+                flash('An error occurred during enrollment. Please try again.', 'danger')
+                return redirect(url_for('main.enroll', courseID=courseID))
         except Exception as e:
             db.session.rollback()
             flash(f'An error occurred during enrollment: {str(e)}', 'danger')
             return redirect(url_for('main.enroll', courseID=courseID))
 
+        if enrollment.paymentStatus:
+            flash(f'You are already enrolled in {course.courseName} for {semester}.', 'info')
+            return redirect(url_for('main.courses'))
+        flash(f'Enrollment initiated for {course.courseName}. Please proceed to payment.', 'success')
+        return redirect(url_for('main.payment', enrollmentID=enrollment.enrollmentID))
+
     return render_template('enroll.html', course=course, user=user)
 
 
 @main.route('/payment/<int:enrollmentID>', methods=['GET', 'POST'])
+@idempotent
 def payment(enrollmentID):
     if 'user_id' not in session:
         flash('You need to be logged in to proceed with payment.', 'warning')
@@ -92,16 +108,6 @@ def payment(enrollmentID):
     if request.method == 'POST':
         paymentMethod = request.form.get('paymentMethod')
 
-        # Create Fee record
-        fee = Fee(
-            enrollmentID=enrollmentID,
-            amount=course.courseFee,
-            dueDate=datetime.utcnow() + timedelta(days=7),
-            paymentMethod=paymentMethod
-        )
-        enrollment.paymentStatus = True
-        enrollment.status = "Active"
-
         # Update user role to Student
         user = Person.query.get(session['user_id'])
         user.role = 'Student'
@@ -111,8 +117,12 @@ def payment(enrollmentID):
         student.courses = course.courseName
 
         try:
-            db.session.add(fee)
+            if not pay_enrollment(enrollment, course.courseFee, paymentMethod):
+                db.session.rollback()
+                flash('Payment has already been completed for this enrollment.', 'info')
+                return redirect(url_for('student.dashboard'))
             db.session.commit()
+            invalidate_gradebook(enrollment.courseID)
             flash('Payment successful! You are now enrolled as a student. Please Log in again to access student dashboard!', 'success')
             return redirect(url_for('main.login'))
         except Exception as e:
@@ -133,7 +143,23 @@ def login():
         user = Person.query.filter_by(email=email).first()
 
         # Check if user exists and password is correct
-        if user and user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return redirect(url_for('main.login'))
+
+        if authenticated:
+            # Upgrade hashes made with an outdated bcrypt cost while we have the password
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except (SQLAlchemyError, PasswordHasherBusy):
+                    # The login still succeeds; the hash is upgraded on a later login
+                    current_app.logger.exception('Password rehash failed for person %s', user.person_id)
+                    db.session.rollback()
+
             # Store user info in session
             session['user_id'] = user.person_id
             session['user_role'] = user.role
@@ -167,8 +193,7 @@ def register():
         confirm_password = request.form['confirm_password']
         
         #Check password strength
-        password_pattern = r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@$!%*?&#])[A-Za-z\d@$!%*?&#]{8,}$'
-        if not re.match(password_pattern, password):
+        if not re.match(PASSWORD_PATTERN, password):
             flash('Password must be at least 8 characters long, include uppercase, lowercase, number, and special character.', 'danger')
             return redirect(url_for('main.register'))
 
@@ -182,7 +207,11 @@ def register():
             return redirect(url_for('main.register'))
 
         new_user = Person(name=name, email=email)
-        new_user.set_password(password) #hash the password
+        try:
+            new_user.set_password(password) #hash the password
+        except PasswordHasherBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return redirect(url_for('main.register'))
         
         try:
             db.session.add(new_user)
@@ -0,0 +1,140 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _RouteStats:
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+class MetricsRegistry:
+    """Thread-safe per-endpoint request and SQL counters for one worker process."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, latency, statements=0, db_time=0.0, rows=0):
+        with self._lock:
+            stats = self._routes.get((endpoint, method))
+            if stats is None:
+                stats = self._routes[(endpoint, method)] = _RouteStats(self.buckets)
+            index = bisect_left(self.buckets, latency)
+            if index < len(self.buckets):
+                stats.bucket_counts[index] += 1
+            stats.count += 1
+            stats.latency_sum += latency
+            stats.statements += statements
+            stats.db_time += db_time
+            stats.rows += rows
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """Render every series in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP ums_request_duration_seconds Request latency by endpoint.',
+                '# TYPE ums_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), stats in routes:
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, stats.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'ums_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'ums_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+                lines.append(f'ums_request_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}')
+                lines.append(f'ums_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+            for name, help_text, attr in (
+                ('ums_sql_statements_total', 'SQL statements executed by endpoint.', 'statements'),
+                ('ums_sql_duration_seconds_total', 'Time spent executing SQL by endpoint.', 'db_time'),
+                ('ums_sql_rows_total', 'Rows reported by the driver by endpoint.', 'rows'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (endpoint, method), stats in routes:
+                    value = getattr(stats, attr)
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{{endpoint="{_escape(endpoint)}",method="{method}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def get_registry():
+    return current_app.extensions['metrics']
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    if not has_request_context() or 'metrics_started' not in g:
+        return
+    g.metrics_statements += 1
+    g.metrics_db_time += time.perf_counter() - started
+    # Drivers with buffered cursors (mysql-connector) report SELECT row counts here
+    if cursor.rowcount and cursor.rowcount > 0:
+        g.metrics_rows += cursor.rowcount
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get('metrics_query_start')
+        if starts:
+            starts.pop()
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_statements = 0
+    g.metrics_db_time = 0.0
+    g.metrics_rows = 0
+
+
+def _finish_request(exc):
+    if 'metrics_started' not in g:
+        return
+    get_registry().observe(
+        request.endpoint or 'unmatched',
+        request.method,
+        time.perf_counter() - g.metrics_started,
+        statements=g.metrics_statements,
+        db_time=g.metrics_db_time,
+        rows=g.metrics_rows,
+    )
+
+
+def init_app(app):
+    """Record latency and SQL activity for every request handled by ``app``."""
+    app.extensions['metrics'] = MetricsRegistry(app.config.get('METRICS_LATENCY_BUCKETS', DEFAULT_BUCKETS))
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.teardown_request(_finish_request)
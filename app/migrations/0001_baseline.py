@@ -0,0 +1,11 @@
+"""Create every table declared in app.models that does not exist yet.
+
+On an empty database this builds the full schema; on a database created by
+hand it only adds what is missing and leaves existing tables untouched.
+"""
+from app import db
+import app.models  # noqa: F401  (registers the tables on db.metadata)
+
+
+def upgrade(op):
+    op.create_tables(db.metadata)
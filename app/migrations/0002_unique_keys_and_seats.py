@@ -0,0 +1,22 @@
+"""Unique keys behind the upserts and enrollment checks, and course seat counters.
+
+Existing duplicate rows stop the migration with a count; remove them and run
+it again. Afterwards run `flask attendance backfill-summary` once to build
+AttendanceSummary from existing attendance.
+"""
+from sqlalchemy import Column, Integer
+
+
+def upgrade(op):
+    op.create_index('uq_attendance_student_course_date', 'Attendance', ['studID', 'courseID', 'date'], unique=True)
+    op.create_index('uq_grade_student_exam', 'Grade', ['studID', 'examID'], unique=True)
+    op.create_index('uq_enrollment_student_course_semester', 'Enrollment', ['studID', 'courseID', 'semester'], unique=True)
+
+    op.add_column('Course', Column('capacity', Integer, nullable=True))
+    op.add_column('Course', Column('seatsTaken', Integer, nullable=False, server_default='0'))
+    op.execute(
+        'UPDATE Course SET seatsTaken = ('
+        ' SELECT COUNT(*) FROM Enrollment'
+        ' WHERE Enrollment.courseID = Course.courseID AND Enrollment.status <> :dropped)',
+        dropped='Dropped',
+    )
@@ -0,0 +1,12 @@
+"""Full-text search documents for people, courses and departments.
+
+Creates SearchDocument with its full-text index (FULLTEXT on MySQL, the FTS5
+table SearchIndex and its triggers on SQLite) and indexes the existing rows.
+"""
+from app import db
+from app.search import rebuild
+
+
+def upgrade(op):
+    op.create_tables(db.metadata, 'SearchDocument')
+    rebuild(op.connection)
@@ -0,0 +1,29 @@
+"""Change feeds: (updatedAt, key) indexes on the synced tables, and Tombstone.
+
+Rows that predate the updatedAt default get their createdAt (or the time of
+the migration), so every row has a place in its table's feed.
+"""
+from datetime import datetime
+from sqlalchemy import func, update
+from app import db
+from app.sync import SYNCED
+
+INDEXES = (
+    ('ix_person_updated', 'Person', ['updatedAt', 'person_id']),
+    ('ix_enrollment_updated', 'Enrollment', ['updatedAt', 'enrollmentID']),
+    ('ix_fee_updated', 'Fee', ['updatedAt', 'feeID']),
+    ('ix_grade_updated', 'Grade', ['updatedAt', 'gradeID']),
+    ('ix_attendance_updated', 'Attendance', ['updatedAt', 'attendanceID']),
+)
+
+
+def upgrade(op):
+    now = datetime.utcnow()
+    for model in SYNCED.values():
+        table = model.__table__
+        op.connection.execute(
+            update(table).where(table.c.updatedAt.is_(None)).values(updatedAt=func.coalesce(table.c.createdAt, now))
+        )
+    for name, table_name, columns in INDEXES:
+        op.create_index(name, table_name, columns)
+    op.create_tables(db.metadata, 'Tombstone')
@@ -0,0 +1,22 @@
+"""University-wide attendance totals: the single AttendanceTotals row.
+
+Starts it from the current AttendanceSummary rows; from then on every
+attendance write moves it by the difference it makes to the summaries.
+"""
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from app import db
+from app.attendance import UNIVERSITY
+from app.models import AttendanceSummary, AttendanceTotals
+
+
+def upgrade(op):
+    op.create_tables(db.metadata, 'AttendanceTotals')
+    if op.connection.execute(select(AttendanceTotals.totalsID)).first() is None:
+        total, attended = op.connection.execute(select(
+            func.coalesce(func.sum(AttendanceSummary.totalClasses), 0),
+            func.coalesce(func.sum(AttendanceSummary.attendedClasses), 0),
+        )).one()
+        op.connection.execute(insert(AttendanceTotals.__table__).values(
+            totalsID=UNIVERSITY, totalClasses=total, attendedClasses=attended, updatedAt=datetime.utcnow(),
+        ))
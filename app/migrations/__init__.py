@@ -0,0 +1,168 @@
+import importlib
+import os
+import pkgutil
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import column, table
+from app import db
+
+# Versioned schema migrations.
+#
+# Each module in app/migrations named NNNN_description.py is one migration,
+# applied in NNNN order by `flask db upgrade` and recorded in SchemaMigration.
+# A migration defines upgrade(op), where op is an Operations bound to the
+# connection. Operations skip work that is already done (a table, column or
+# index that exists), so a migration can run against a fresh database, a
+# database created by hand from the models, or one where it half-applied
+# before failing (MySQL commits DDL immediately, so there is no rollback).
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'SchemaMigration', _metadata,
+    Column('version', String(20), primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('appliedAt', DateTime, nullable=False),
+)
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+class Operations:
+    """Idempotent schema operations on one connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = connection.dialect
+        self._quote = connection.dialect.identifier_preparer.quote
+
+    def _inspector(self):
+        # A fresh inspector each time; inspectors cache what they have seen
+        return inspect(self.connection)
+
+    def has_table(self, table_name):
+        return self._inspector().has_table(table_name)
+
+    def has_column(self, table_name, column_name):
+        return any(c['name'] == column_name for c in self._inspector().get_columns(table_name))
+
+    def has_index(self, table_name, index_name):
+        inspector = self._inspector()
+        names = {index['name'] for index in inspector.get_indexes(table_name)}
+        names.update(constraint['name'] for constraint in inspector.get_unique_constraints(table_name))
+        return index_name in names
+
+    def create_tables(self, metadata, *table_names):
+        """Create the named tables (all of ``metadata`` when none are named) that do not exist yet."""
+        tables = [metadata.tables[name] for name in table_names] if table_names else None
+        metadata.create_all(self.connection, tables=tables, checkfirst=True)
+
+    def add_column(self, table_name, column_obj):
+        if self.has_column(table_name, column_obj.name):
+            return
+        ddl = CreateColumn(column_obj).compile(dialect=self.dialect)
+        self.connection.execute(text(f'ALTER TABLE {self._quote(table_name)} ADD COLUMN {ddl}'))
+
+    def create_index(self, index_name, table_name, columns, unique=False):
+        """CREATE [UNIQUE] INDEX unless an index or unique constraint of that name exists.
+
+        Before a unique index is built the existing rows are checked, so
+        duplicates fail with a count rather than a driver error halfway through.
+        """
+        if self.has_index(table_name, index_name):
+            return
+        if unique:
+            target = table(table_name, *(column(name) for name in columns))
+            key = [target.c[name] for name in columns]
+            duplicates = self.connection.execute(
+                select(func.count()).select_from(
+                    select(*key).group_by(*key).having(func.count() > 1).subquery()
+                )
+            ).scalar()
+            if duplicates:
+                raise MigrationError(
+                    f'{table_name} has {duplicates} duplicate ({", ".join(columns)}) groups; '
+                    f'resolve them before creating {index_name}'
+                )
+        self.connection.execute(text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX {self._quote(index_name)} "
+            f"ON {self._quote(table_name)} ({', '.join(self._quote(name) for name in columns)})"
+        ))
+
+    def execute(self, sql, **params):
+        return self.connection.execute(text(sql), params)
+
+
+def available():
+    """[(version, name, module name)] for every migration module, in order."""
+    migrations = []
+    for info in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        version, _, name = info.name.partition('_')
+        if version.isdigit():
+            migrations.append((version, name, f'{__name__}.{info.name}'))
+    return sorted(migrations)
+
+
+def applied(connection):
+    _metadata.create_all(connection, checkfirst=True)
+    return {row.version for row in connection.execute(select(schema_migrations.c.version))}
+
+
+def upgrade(engine, target=None, echo=print):
+    """Apply pending migrations up to ``target`` (all when None), one transaction each."""
+    with engine.begin() as connection:
+        done = applied(connection)
+    count = 0
+    for version, name, module_name in available():
+        if target is not None and version > target:
+            break
+        if version in done:
+            continue
+        module = importlib.import_module(module_name)
+        with engine.begin() as connection:
+            module.upgrade(Operations(connection))
+            connection.execute(schema_migrations.insert().values(
+                version=version, name=name, appliedAt=datetime.utcnow()
+            ))
+        echo(f'Applied {version} {name}')
+        count += 1
+    return count
+
+
+db_cli = AppGroup('db', help='Database schema commands.')
+
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', default=None, help='Stop after this version.')
+def upgrade_command(target):
+    """Apply pending migrations."""
+    try:
+        count = upgrade(db.engine, target, echo=click.echo)
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'{count} migrations applied.' if count else 'Database is up to date.')
+
+
+@db_cli.command('history')
+def history_command():
+    """List migrations and whether each has been applied."""
+    with db.engine.begin() as connection:
+        done = applied(connection)
+    for version, name, _ in available():
+        click.echo(f"{'[x]' if version in done else '[ ]'} {version} {name}")
+
+
+@db_cli.command('check-plans')
+def check_plans_command():
+    """EXPLAIN the hot queries and fail if any of them stops using its index."""
+    from app.query_plans import check_plans
+    failures = 0
+    for name, ok, detail in check_plans(db.engine):
+        failures += not ok
+        click.echo(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+    if failures:
+        raise SystemExit(1)
@@ -1,11 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import bcrypt
 from app import db
+from app.passwords import get_hasher
+
+# Index policy: secondary indexes are declared in __table_args__ so create_all
+# and the migrations in app/migrations agree; a migration adds each one to
+# existing databases under the same name.
+
+# Loading policy: many-to-one relationships that list views read per row are eager
+# loaded, 'joined' for required parents and 'selectin' where rows repeat the same
+# parents, so rendering a table never falls back to one lazy SELECT per row.
 
 # Person Table
 class Person(db.Model):
     __tablename__ = 'Person'
+    __table_args__ = (
+        db.Index('ix_person_role', 'role'),
+        db.Index('ix_person_updated', 'updatedAt', 'person_id'),
+    )
     person_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.Enum('Admin', 'Student', 'Professor', 'User'), nullable=False, default='User')
@@ -22,13 +34,16 @@ class Person(db.Model):
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def set_password(self, raw_password):
-        """Hash the password using bcrypt."""
-        hashed = bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt())
-        self.password = hashed.decode('utf-8')
+        """Hash the password using bcrypt on the shared hashing pool."""
+        self.password = get_hasher().hash(raw_password)
 
     def check_password(self, raw_password):
         """Check if the raw password matches the stored hash."""
-        return bcrypt.checkpw(raw_password.encode('utf-8'), self.password.encode('utf-8'))
+        return get_hasher().verify(raw_password, self.password)
+
+    def password_needs_rehash(self):
+        """True when the stored hash was made with a different bcrypt cost than configured."""
+        return get_hasher().needs_rehash(self.password)
 
     def __repr__(self):
         return f"<Person(id={self.person_id}, name={self.name})>"
@@ -50,6 +65,9 @@ class Address(db.Model):
 # Student Table
 class Student(db.Model):
     __tablename__ = 'Student'
+    __table_args__ = (
+        db.Index('ix_student_person', 'person_id'),
+    )
     person_id = db.Column(db.Integer, db.ForeignKey('Person.person_id', ondelete='CASCADE'), nullable=False)
     studID = db.Column(db.String(20), primary_key=True, unique=True, nullable=False)
     courses = db.Column(db.Text, nullable=True)
@@ -60,11 +78,14 @@ class Student(db.Model):
 # Professor Table
 class Professor(db.Model):
     __tablename__ = 'Professor'
+    __table_args__ = (
+        db.Index('ix_professor_person', 'person_id'),
+    )
     person_id = db.Column(db.Integer, db.ForeignKey('Person.person_id', ondelete='CASCADE'), nullable=False)
     profID = db.Column(db.String(20), primary_key=True, unique=True, nullable=False)
     department_id = db.Column(db.String(20), db.ForeignKey('Department.departmentID', ondelete='CASCADE'), nullable=False)
-    person = db.relationship('Person', backref='professor', lazy=True)
-    department = db.relationship('Department', backref='professors', lazy=True)
+    person = db.relationship('Person', backref='professor', lazy='joined', innerjoin=True)
+    department = db.relationship('Department', backref='professors', lazy='joined', innerjoin=True)
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -101,15 +122,22 @@ class Course(db.Model):
     duration = db.Column(db.String(50), nullable=True)
     description = db.Column(db.Text, nullable=True)
     courseFee = db.Column(db.DECIMAL(10, 2), default=0.00) 
+    capacity = db.Column(db.Integer, nullable=True)  # None means unlimited seats
+    seatsTaken = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # maintained by app.enrollment
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    department = db.relationship("Department", backref="courses")
+    department = db.relationship("Department", backref="courses", lazy='joined', innerjoin=True)
 
 # Enrollment Table
 class Enrollment(db.Model):
     __tablename__ = 'Enrollment'
+    __table_args__ = (
+        db.Index('ix_enrollment_course_status', 'courseID', 'status'),
+        db.UniqueConstraint('studID', 'courseID', 'semester', name='uq_enrollment_student_course_semester'),
+        db.Index('ix_enrollment_updated', 'updatedAt', 'enrollmentID'),
+    )
     enrollmentID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     studID = db.Column(db.String(20), db.ForeignKey('Student.studID', ondelete='CASCADE'), nullable=False)
     courseID = db.Column(db.String(20), db.ForeignKey('Course.courseID', ondelete='CASCADE'), nullable=False)
@@ -125,6 +153,11 @@ class Enrollment(db.Model):
 # Attendance Table
 class Attendance(db.Model):
     __tablename__ = 'Attendance'
+    __table_args__ = (
+        db.Index('ix_attendance_course_date', 'courseID', 'date'),
+        db.UniqueConstraint('studID', 'courseID', 'date', name='uq_attendance_student_course_date'),
+        db.Index('ix_attendance_updated', 'updatedAt', 'attendanceID'),
+    )
     attendanceID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     studID = db.Column(db.String(20), db.ForeignKey('Student.studID', ondelete='CASCADE'), nullable=False)
     profID = db.Column(db.String(20), db.ForeignKey('Professor.profID', ondelete='CASCADE'), nullable=False)
@@ -134,13 +167,45 @@ class Attendance(db.Model):
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    student = db.relationship('Student', backref='attendance')
-    professor = db.relationship('Professor', backref='attendance')
-    course = db.relationship('Course', backref='attendance')
-    
+    student = db.relationship('Student', backref='attendance', lazy='selectin')
+    professor = db.relationship('Professor', backref='attendance', lazy='selectin')
+    course = db.relationship('Course', backref='attendance', lazy='selectin')
+
+
+# Attendance Summary Table (maintained by app.attendance on every attendance write)
+class AttendanceSummary(db.Model):
+    __tablename__ = 'AttendanceSummary'
+    studID = db.Column(db.String(20), db.ForeignKey('Student.studID', ondelete='CASCADE'), primary_key=True)
+    courseID = db.Column(db.String(20), db.ForeignKey('Course.courseID', ondelete='CASCADE'), primary_key=True, index=True)
+    totalClasses = db.Column(db.Integer, nullable=False, default=0)
+    attendedClasses = db.Column(db.Integer, nullable=False, default=0)
+    lastDate = db.Column(db.DateTime, nullable=True)
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def percentage(self):
+        return (self.attendedClasses / self.totalClasses) * 100 if self.totalClasses else 0
+
+
+# University-wide attendance totals: the sums of AttendanceSummary, kept in one row by app.attendance
+class AttendanceTotals(db.Model):
+    __tablename__ = 'AttendanceTotals'
+    totalsID = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    totalClasses = db.Column(db.Integer, nullable=False, default=0)
+    attendedClasses = db.Column(db.Integer, nullable=False, default=0)
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def percentage(self):
+        return (self.attendedClasses / self.totalClasses) * 100 if self.totalClasses else 0
+
 # Fee Table
 class Fee(db.Model):
     __tablename__ = 'Fee'
+    __table_args__ = (
+        db.Index('ix_fee_enrollment', 'enrollmentID'),
+        db.Index('ix_fee_updated', 'updatedAt', 'feeID'),
+    )
     feeID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     enrollmentID = db.Column(db.Integer, db.ForeignKey('Enrollment.enrollmentID', ondelete='CASCADE'), nullable=False)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -153,6 +218,9 @@ class Fee(db.Model):
 # Exam Table
 class Exam(db.Model):
     __tablename__ = 'Exam'
+    __table_args__ = (
+        db.Index('ix_exam_course_date', 'courseID', 'date'),
+    )
     examID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     courseID = db.Column(db.String(20), db.ForeignKey('Course.courseID', ondelete='CASCADE'), nullable=False)
     location = db.Column(db.String(255), nullable=False)
@@ -164,11 +232,14 @@ class Exam(db.Model):
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Add this relationship
-    course = db.relationship('Course', backref='exams')
+    course = db.relationship('Course', backref='exams', lazy='joined', innerjoin=True)
 
 
 class Submission(db.Model):
     __tablename__ = 'Submission'
+    __table_args__ = (
+        db.Index('ix_submission_exam_student', 'examID', 'studID'),
+    )
     submissionID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     examID = db.Column(db.Integer, db.ForeignKey('Exam.examID', ondelete='CASCADE'), nullable=False)
     studID = db.Column(db.String(20), db.ForeignKey('Student.studID', ondelete='CASCADE'), nullable=False)
@@ -176,12 +247,17 @@ class Submission(db.Model):
     submittedat = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
-    exam = db.relationship('Exam', backref='submissions')
-    student = db.relationship('Student', backref='submissions')
+    exam = db.relationship('Exam', backref='submissions', lazy='selectin')
+    student = db.relationship('Student', backref='submissions', lazy='selectin')
     
 # Grade Table
 class Grade(db.Model):
     __tablename__ = 'Grade'
+    __table_args__ = (
+        db.Index('ix_grade_exam_grade', 'examID', 'grade'),
+        db.UniqueConstraint('studID', 'examID', name='uq_grade_student_exam'),
+        db.Index('ix_grade_updated', 'updatedAt', 'gradeID'),
+    )
     gradeID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     courseID = db.Column(db.String(20), db.ForeignKey('Course.courseID', ondelete='CASCADE'), nullable=False)
     studID = db.Column(db.String(20), db.ForeignKey('Student.studID', ondelete='CASCADE'), nullable=False)
@@ -192,3 +268,60 @@ class Grade(db.Model):
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+
+
+# Idempotency keys for form POSTs that must not run twice (see app.idempotency)
+class IdempotencyKey(db.Model):
+    __tablename__ = 'IdempotencyKey'
+    key = db.Column(db.String(64), primary_key=True)
+    person_id = db.Column(db.Integer, db.ForeignKey('Person.person_id', ondelete='CASCADE'), nullable=True)
+    endpoint = db.Column(db.String(100), nullable=False)
+    location = db.Column(db.String(500), nullable=True)  # redirect target once the request has completed
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+# Deleted rows of the delta-synced tables, so change feeds can report deletes (see app.sync)
+class Tombstone(db.Model):
+    __tablename__ = 'Tombstone'
+    __table_args__ = (
+        db.Index('ix_tombstone_entity_deleted', 'entity', 'deletedAt', 'ref'),
+    )
+    tombstoneID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)  # table name, e.g. 'Enrollment'
+    ref = db.Column(db.Integer, nullable=False)  # primary key of the deleted row
+    deletedAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Search documents for people, courses and departments (kept in sync by app.search).
+# MySQL searches them through the FULLTEXT indexes below; SQLite through the FTS5
+# table SearchIndex, an external-content index over this table maintained by triggers.
+class SearchDocument(db.Model):
+    __tablename__ = 'SearchDocument'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'ref', name='uq_search_document'),
+        db.Index('ft_search_document', 'title', 'body', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+        db.Index('ft_search_title', 'title', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+    docID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(20), nullable=False)  # person, course or department
+    ref = db.Column(db.String(20), nullable=False)  # person_id, courseID or departmentID
+    link = db.Column(db.String(40), nullable=False)  # admin page of the result, e.g. 'student:S0001'
+    title = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+for _statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS SearchIndex USING fts5("
+    "title, body, content='SearchDocument', content_rowid='docID', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8')",
+    "CREATE TRIGGER IF NOT EXISTS SearchDocument_ai AFTER INSERT ON SearchDocument BEGIN "
+    "INSERT INTO SearchIndex(rowid, title, body) VALUES (new.docID, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS SearchDocument_ad AFTER DELETE ON SearchDocument BEGIN "
+    "INSERT INTO SearchIndex(SearchIndex, rowid, title, body) VALUES ('delete', old.docID, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS SearchDocument_au AFTER UPDATE ON SearchDocument BEGIN "
+    "INSERT INTO SearchIndex(SearchIndex, rowid, title, body) VALUES ('delete', old.docID, old.title, old.body); "
+    "INSERT INTO SearchIndex(rowid, title, body) VALUES (new.docID, new.title, new.body); END",
+):
+    db.event.listen(SearchDocument.__table__, 'after_create', db.DDL(_statement).execute_if(dialect='sqlite'))
+db.event.listen(SearchDocument.__table__, 'after_drop', db.DDL('DROP TABLE IF EXISTS SearchIndex').execute_if(dialect='sqlite'))
@@ -0,0 +1,177 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+
+class Page:
+    """One page of keyset-paginated rows plus the cursors around it."""
+
+    def __init__(self, items, sort, direction, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.sort = sort
+        self.direction = direction
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _dump(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load(column, value):
+    # Turn a JSON cursor value back into what the column expects to be bound with
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_dump(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor into bind values for ``columns``; returns None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [_load(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        return None
+
+
+def _seek(sort_column, key_column, values, descending):
+    # Rows strictly after (sort_value, key_value) in the requested order
+    if sort_column is key_column:
+        return key_column < values[0] if descending else key_column > values[0]
+    sort_value, key_value = values
+    if descending:
+        return or_(sort_column < sort_value, and_(sort_column == sort_value, key_column < key_value))
+    return or_(sort_column > sort_value, and_(sort_column == sort_value, key_column > key_value))
+
+
+def _order(sort_column, key_column, descending):
+    columns = [sort_column] if sort_column is key_column else [sort_column, key_column]
+    return [c.desc() if descending else c.asc() for c in columns]
+
+
+def _row_value(row, column):
+    return getattr(row, column.key)
+
+
+def _per_page(per_page):
+    default = current_app.config.get('PAGINATION_PER_PAGE', 50)
+    maximum = current_app.config.get('PAGINATION_MAX_PER_PAGE', 500)
+    if per_page is None:
+        per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page or default, maximum))
+
+
+def keyset_paginate(query, key, sortable=None, default_sort=None, per_page=None):
+    """Paginate ``query`` by seeking on ``key`` instead of using OFFSET.
+
+    ``sortable`` maps the names accepted in ``?sort=`` to columns; each column must be
+    non-nullable, ORDER BY the same way its ``<`` and ``>`` compare (not an ENUM, which
+    MySQL orders by declaration index but compares as a string) and be readable as an
+    attribute of the returned rows. The primary key is always appended as a tie-breaker
+    so the ordering is total. Reads ``sort``, ``dir``, ``after``, ``before`` and
+    ``per_page`` from the query string.
+    """
+    sortable = dict(sortable or {})
+    sortable.setdefault(key.key, key)
+    sort = request.args.get('sort', default_sort or key.key)
+    if sort not in sortable:
+        sort = default_sort or key.key
+    sort_column = sortable[sort]
+    direction = 'desc' if request.args.get('dir') == 'desc' else 'asc'
+    descending = direction == 'desc'
+    per_page = _per_page(per_page)
+
+    cursor_columns = [key] if sort_column is key else [sort_column, key]
+    after = request.args.get('after')
+    before = request.args.get('before')
+    values = decode_cursor(before or after, cursor_columns) if (before or after) else None
+    backwards = values is not None and bool(before)
+
+    if values is not None:
+        # Walking backwards is the same seek with the order flipped
+        query = query.filter(_seek(sort_column, key, values, descending != backwards))
+    rows = (
+        query.order_by(*_order(sort_column, key, descending != backwards))
+        .limit(per_page + 1)
+        .all()
+    )
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, values is not None
+
+    def cursor_for(row):
+        return encode_cursor([_row_value(row, c) for c in cursor_columns])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = cursor_for(rows[-1])
+        if has_prev:
+            prev_cursor = cursor_for(rows[0])
+
+    return Page(rows, sort, direction, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def iter_keyset(query, key, batch_size=1000):
+    """Yield every row of ``query`` in ``key`` order, loading ``batch_size`` rows at a time.
+
+    Each batch is its own seek query, so memory stays flat even on drivers that
+    buffer whole result sets client-side (where ``yield_per`` cannot help).
+    """
+    last = None
+    while True:
+        batch = query
+        if last is not None:
+            batch = batch.filter(key > last)
+        rows = batch.order_by(key.asc()).limit(batch_size).all()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last = _row_value(rows[-1], key)
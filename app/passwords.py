@@ -0,0 +1,96 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from flask import current_app, has_app_context
+
+DEFAULT_ROUNDS = 12
+
+# Password policy shared by registration and bulk imports
+PASSWORD_PATTERN = r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@$!%*?&#])[A-Za-z\d@$!%*?&#]{8,}$'
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing pool has no free slot within the configured wait."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so a small pool caps how many cores
+    password work can take at once; ``max_pending`` bounds the queue behind it
+    so a login storm is turned away quickly instead of piling up on every worker.
+    """
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=None, max_pending=None, wait_timeout=None):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(self.workers + (max_pending or self.workers * 4))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHasherBusy('Password hashing pool is saturated.')
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, raw_password):
+        hashed = self._run(bcrypt.hashpw, raw_password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def verify(self, raw_password, hashed):
+        return self._run(bcrypt.checkpw, raw_password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def hash_password(raw_password, rounds=DEFAULT_ROUNDS):
+    """Plain bcrypt hash; module-level so it can run in a process pool."""
+    return bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def hash_rounds(hashed):
+    """Return the cost factor stored in a ``$2b$<rounds>$...`` hash, or None."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def get_hasher():
+    """The app's hasher, or an inline one when running outside an app context."""
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return current_app.extensions['password_hasher']
+    return _inline_hasher
+
+
+class _InlineHasher:
+    rounds = DEFAULT_ROUNDS
+
+    def hash(self, raw_password):
+        return hash_password(raw_password, self.rounds)
+
+    def verify(self, raw_password, hashed):
+        return bcrypt.checkpw(raw_password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+
+_inline_hasher = _InlineHasher()
+
+
+def init_app(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        rounds=app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS),
+        workers=app.config.get('BCRYPT_WORKERS'),
+        max_pending=app.config.get('BCRYPT_MAX_PENDING'),
+        wait_timeout=app.config.get('BCRYPT_WAIT_TIMEOUT'),
+    )
@@ -1,17 +1,26 @@
 import os
-from flask import render_template, request, redirect, url_for, flash, session, current_app
+from flask import render_template, request, redirect, url_for, flash, session, current_app, g
 from functools import wraps
 from datetime import datetime
 from app.professor import professor
 from app.models import db, Professor, Course, Exam, Submission, Attendance, Grade, Enrollment
+from app.query_budget import query_budget
+from app.attendance import mark_attendance as record_attendance, course_summaries
+from app.storage import parse_ref, send_blob, zip_response
+from app.grading import grades_changed, parse_grade_csv, record_grades, validate_grades
+from app.gradebook import course_gradebook, invalidate_gradebook
+from app.exam_stats import course_statistics, exam_statistics, summarise
 
 
 def professor_required(f):
+    """Allow professors only, and load the logged-in Professor once per request into g.professor."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if session.get('user_role') != 'Professor': 
             flash('Unauthorized access! Professor only.', 'danger')
             return redirect(url_for('main.profile')) 
+        if g.get('professor') is None:
+            g.professor = Professor.query.filter_by(person_id=session['user_id']).first_or_404()
         return f(*args, **kwargs)
     return decorated_function
 
@@ -22,19 +31,40 @@ def dashboard():
 
 @professor.route('/courses', methods=['GET'])
 @professor_required
+@query_budget(2)
 def view_courses():
-    professor = Professor.query.filter_by(person_id=session['user_id']).first_or_404()
+    professor = g.professor
     courses = Course.query.filter_by(departmentID=professor.department_id).all()
     return render_template('view_courses.html', courses=courses)
 
 
 @professor.route('/courses/<string:courseID>/exams', methods=['GET'])
 @professor_required
+@query_budget(3)
 def view_course_exams(courseID):
     exams = Exam.query.filter_by(courseID=courseID).all()
     course = Course.query.get_or_404(courseID)
     return render_template('view_course_exams.html', exams=exams, course=course)
 
+@professor.route('/courses/<string:courseID>/gradebook', methods=['GET'])
+@professor_required
+def view_gradebook(courseID):
+    course = Course.query.get_or_404(courseID)
+    return render_template('gradebook.html', course=course, gradebook=course_gradebook(courseID))
+
+@professor.route('/courses/<string:courseID>/statistics', methods=['GET'])
+@professor_required
+def view_course_statistics(courseID):
+    course = Course.query.get_or_404(courseID)
+    exams = Exam.query.filter_by(courseID=courseID).order_by(Exam.date, Exam.examID).all()
+
+    # Distribution of weighted final marks, from the cached gradebook
+    finals = sorted(row[3] for row in course_gradebook(courseID).rows if row[3] is not None)
+    return render_template(
+        'course_statistics.html', course=course,
+        exams=course_statistics(exams), finals=summarise(None, 100.0, finals),
+    )
+
 @professor.route('/courses/<string:courseID>/create_exam', methods=['GET', 'POST'])
 @professor_required
 def create_exam(courseID):
@@ -61,6 +91,7 @@ def create_exam(courseID):
         try:
             db.session.add(new_exam)
             db.session.commit()
+            invalidate_gradebook(courseID)
             flash(f'{examType} created successfully for {course.courseName}!', 'success')
             return redirect(url_for('professor.view_course_exams', courseID=courseID))
         except Exception as e:
@@ -92,6 +123,7 @@ def edit_exam(examID):
 
         try:
             db.session.commit()
+            grades_changed(exam)
             flash('Exam updated successfully!', 'success')
             return redirect(url_for('professor.view_course_exams', courseID=exam.courseID))
         except Exception as e:
@@ -109,6 +141,7 @@ def delete_exam(examID):
     try:
         db.session.delete(exam)
         db.session.commit()
+        invalidate_gradebook(exam.courseID)
         flash('Exam deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -118,6 +151,7 @@ def delete_exam(examID):
 
 @professor.route('/exams/<int:examID>/submissions', methods=['GET'])
 @professor_required
+@query_budget(5)
 def view_submissions(examID):
     exam = Exam.query.get_or_404(examID)
 
@@ -131,6 +165,45 @@ def view_submissions(examID):
     return render_template('view_submissions.html', submissions=submissions, exam=exam)
 
 
+@professor.route('/exams/<int:examID>/statistics', methods=['GET'])
+@professor_required
+def view_exam_statistics(examID):
+    exam = Exam.query.get_or_404(examID)
+    return render_template('exam_statistics.html', exam=exam, stats=exam_statistics(exam))
+
+
+@professor.route('/submissions/<int:submissionID>/download', methods=['GET'])
+@professor_required
+def download_submission(submissionID):
+    submission = Submission.query.get_or_404(submissionID)
+    _, filename = parse_ref(submission.filepath)
+    return send_blob(submission.filepath, f'{submission.studID}_{filename}')
+
+
+@professor.route('/exams/<int:examID>/submissions.zip', methods=['GET'])
+@professor_required
+def download_exam_submissions(examID):
+    exam = Exam.query.get_or_404(examID)
+    submissions = (
+        db.session.query(Submission.submissionID, Submission.studID, Submission.filepath, Submission.submittedat)
+        .filter(Submission.examID == examID)
+        .order_by(Submission.studID, Submission.submittedat)
+        .all()
+    )
+
+    entries = []
+    names = set()
+    for submission in submissions:
+        _, filename = parse_ref(submission.filepath)
+        arcname = f'{submission.studID}/{filename}'
+        if arcname in names:
+            arcname = f'{submission.studID}/{submission.submissionID}_{filename}'
+        names.add(arcname)
+        entries.append((arcname, submission.filepath, submission.submittedat))
+
+    return zip_response(entries, f'{exam.courseID}_exam_{examID}_submissions.zip')
+
+
 @professor.route('/submissions/<int:submissionID>/mark', methods=['GET', 'POST'])
 @professor_required
 def mark_submission(submissionID):
@@ -139,31 +212,21 @@ def mark_submission(submissionID):
     exam = Exam.query.get_or_404(submission.examID)
 
     if request.method == 'POST':
-        grade_value = float(request.form['grade']) 
+        try:
+            grade_value = float(request.form['grade'])
+        except ValueError:
+            flash('Error: Grade must be a number.', 'danger')
+            return redirect(url_for('professor.mark_submission', submissionID=submission.submissionID))
 
-        # Check if a grade already exists for this submission
-        grade = Grade.query.filter_by(studID=submission.studID, examID=submission.examID).first()
+        if not 0 <= grade_value <= exam.maxMarks:
+            flash(f'Error: Grade must be between 0 and {exam.maxMarks:g}.', 'danger')
+            return redirect(url_for('professor.mark_submission', submissionID=submission.submissionID))
 
         try:
-            if grade_value > 100:
-                flash('Error: Grade must not be over 100.', 'danger')
-                return redirect(url_for('professor.mark_submission', submissionID=submission.submissionID))
-            
-            if grade:
-                # Update existing grade
-                grade.grade = grade_value
-            else:
-                # Insert new grade
-                new_grade = Grade(
-                    courseID=exam.courseID,
-                    studID=submission.studID,
-                    examID=submission.examID,
-                    grade=grade_value,
-                    gradeCategory=exam.examType,
-                )
-                db.session.add(new_grade)
-
+            saved = record_grades(exam, {submission.studID: (grade_value, request.form.get('feedback') or None)})
             db.session.commit()
+            if saved:
+                grades_changed(exam)
             flash('Submission marked successfully!', 'success')
             return redirect(url_for('professor.view_submissions', examID=submission.examID))
         except Exception as e:
@@ -172,15 +235,61 @@ def mark_submission(submissionID):
 
     return render_template('mark_submission.html', submission=submission, exam=exam)
 
+@professor.route('/exams/<int:examID>/grades', methods=['POST'])
+@professor_required
+def grade_submissions(examID):
+    exam = Exam.query.get_or_404(examID)
+
+    # Either an uploaded CSV (studID,grade[,feedback]) or the grade-<studID> inputs of view_submissions
+    upload = request.files.get('grades_csv')
+    if upload and upload.filename:
+        try:
+            entries = parse_grade_csv(upload.stream)
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Could not read the CSV file: {str(e)}', 'danger')
+            return redirect(url_for('professor.view_submissions', examID=examID))
+        entries = [(f'line {line}', studID, grade, feedback) for line, studID, grade, feedback in entries]
+    else:
+        entries = []
+        for key, value in request.form.items():
+            if key.startswith('grade-'):
+                studID = key[len('grade-'):]
+                entries.append((None, studID, value.strip(), request.form.get(f'feedback-{studID}')))
+
+    grades, errors = validate_grades(exam, entries)
+    try:
+        saved = record_grades(exam, grades)
+        db.session.commit()
+        if saved:
+            grades_changed(exam)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'An error occurred while saving grades: {str(e)}', 'danger')
+        return redirect(url_for('professor.view_submissions', examID=examID))
+
+    if saved:
+        flash(f'Saved {saved} grades.', 'success')
+    for label, message in errors[:20]:
+        flash(f'{label}: {message}' if label else message, 'danger')
+    if len(errors) > 20:
+        flash(f'{len(errors) - 20} more entries were rejected.', 'danger')
+    if not saved and not errors:
+        flash('No grades were changed.' if grades else 'No grades were entered.', 'warning')
+    return redirect(url_for('professor.view_submissions', examID=examID))
+
 @professor.route('/courses/<string:courseID>/attendance', methods=['GET', 'POST'])
 @professor_required
+@query_budget(5)
 def mark_attendance(courseID):
     course = Course.query.get_or_404(courseID)
 
-    # Query the professor using session user_id
-    professor = Professor.query.filter_by(person_id=session['user_id']).first_or_404()
+    professor = g.professor
 
-    enrollments = Enrollment.query.filter_by(courseID=courseID, status='Active').all()
+    enrollments = (
+        db.session.query(Enrollment.studID)
+        .filter_by(courseID=courseID, status='Active')
+        .all()
+    )
 
     # Get the current date in 'YYYY-MM-DD' format
     current_date = datetime.utcnow().strftime('%Y-%m-%d')
@@ -189,21 +298,12 @@ def mark_attendance(courseID):
         attendance_date = datetime.strptime(request.form['date'], '%Y-%m-%d')
         present_students = request.form.getlist('present')
 
-        try:
-            for enrollment in enrollments:
-                studID = enrollment.studID
-                status = studID in present_students  # Mark as present if in the list
-
-                # Create attendance record
-                new_attendance = Attendance(
-                    studID=studID,
-                    profID=professor.profID,  # Use the correct profID
-                    courseID=courseID,
-                    date=attendance_date,
-                    status=status
-                )
-                db.session.add(new_attendance)
+        present = set(present_students)
+        statuses = {enrollment.studID: enrollment.studID in present for enrollment in enrollments}
 
+        try:
+            # One upsert for the whole class; resubmitting the same date overwrites it
+            record_attendance(courseID, professor.profID, attendance_date, statuses)
             db.session.commit()
             flash('Attendance marked successfully!', 'success')
             return redirect(url_for('professor.view_courses'))
@@ -211,6 +311,12 @@ def mark_attendance(courseID):
             db.session.rollback()
             flash(f'An error occurred while marking attendance: {str(e)}', 'danger')
 
-    return render_template('mark_attendance.html', course=course, enrollments=enrollments, current_date=current_date)
+    return render_template(
+        'mark_attendance.html',
+        course=course,
+        enrollments=enrollments,
+        summaries=course_summaries(courseID),
+        current_date=current_date
+    )
 
 
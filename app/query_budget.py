@@ -0,0 +1,47 @@
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a request issues more SQL statements than its route allows."""
+
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements the decorated view may issue."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.query_budget = limit
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def _check_budget(response):
+    limit = g.get('query_budget', current_app.config.get('QUERY_BUDGET_DEFAULT'))
+    count = g.get('query_count', 0)
+    if limit is not None and count > limit:
+        raise QueryBudgetExceeded(
+            f'{request.endpoint} issued {count} SQL statements, budget is {limit}'
+        )
+    return response
+
+
+def init_app(app):
+    """Enforce per-route query budgets; on by default only when TESTING."""
+    enforce = app.config.get('QUERY_BUDGET_ENFORCE')
+    if enforce is None:
+        enforce = app.config.get('TESTING', False)
+    if not enforce:
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+    app.after_request(_check_budget)
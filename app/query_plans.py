@@ -0,0 +1,120 @@
+import re
+from datetime import date, datetime
+from sqlalchemy import inspect, or_, select, text
+from app.models import Attendance, Enrollment, Exam, Fee, Grade, Person, Professor, Student, Submission, Tombstone
+
+# The hot queries and the leading columns of the index each one should use
+# (ix_*/uq_* in app.models). Matching on columns rather than index names keeps
+# the check valid where the database names constraint indexes itself, such as
+# SQLite's sqlite_autoindex_*. Column selects keep eager-loaded relationships
+# out of the plans. The values are placeholders; only the shape of the
+# WHERE/ORDER BY matters to the planner.
+HOT_QUERIES = (
+    ('enrollments of a student',
+     select(Enrollment.enrollmentID, Enrollment.status).where(Enrollment.studID == 'S0001'),
+     ('studID',)),
+    ('active roster of a course',
+     select(Enrollment.studID).where(Enrollment.courseID == 'C1', Enrollment.status == 'Active'),
+     ('courseID', 'status')),
+    ('attendance of a student in a course',
+     select(Attendance.date, Attendance.status).where(Attendance.studID == 'S0001', Attendance.courseID == 'C1').order_by(Attendance.date),
+     ('studID', 'courseID')),
+    ('attendance of a course on a date',
+     select(Attendance.studID, Attendance.status).where(Attendance.courseID == 'C1', Attendance.date == date(2024, 1, 1)),
+     ('courseID', 'date')),
+    ('grade of a student for an exam',
+     select(Grade.gradeID, Grade.grade).where(Grade.studID == 'S0001', Grade.examID == 1),
+     ('studID', 'examID')),
+    ('grades of an exam in order',
+     select(Grade.grade).where(Grade.examID == 1).order_by(Grade.grade),
+     ('examID', 'grade')),
+    ('submissions of an exam',
+     select(Submission.submissionID, Submission.studID).where(Submission.examID == 1),
+     ('examID',)),
+    ('exams of a course',
+     select(Exam.examID, Exam.date).where(Exam.courseID == 'C1').order_by(Exam.date),
+     ('courseID', 'date')),
+    ('people with a role',
+     select(Person.person_id).where(Person.role == 'Professor'),
+     ('role',)),
+    ('student of a person',
+     select(Student.studID).where(Student.person_id == 1),
+     ('person_id',)),
+    ('professor of a person',
+     select(Professor.profID).where(Professor.person_id == 1),
+     ('person_id',)),
+    ('fees of an enrollment',
+     select(Fee.feeID, Fee.amount).where(Fee.enrollmentID == 1),
+     ('enrollmentID',)),
+    ('enrollments changed since',
+     select(Enrollment.enrollmentID, Enrollment.updatedAt).where(Enrollment.updatedAt > datetime(2024, 1, 1))
+     .order_by(Enrollment.updatedAt, Enrollment.enrollmentID),
+     ('updatedAt', 'enrollmentID')),
+    ('full sync of enrollments',
+     select(Enrollment.enrollmentID, Enrollment.updatedAt)
+     .where(or_(Enrollment.updatedAt.is_(None), Enrollment.updatedAt <= datetime(2024, 1, 1)))
+     .order_by(Enrollment.updatedAt, Enrollment.enrollmentID).limit(500),
+     ('updatedAt', 'enrollmentID')),
+    ('tombstones of a table since',
+     select(Tombstone.ref).where(Tombstone.entity == 'Enrollment', Tombstone.deletedAt > datetime(2024, 1, 1))
+     .order_by(Tombstone.deletedAt, Tombstone.ref),
+     ('entity', 'deletedAt')),
+)
+
+
+def _sql(statement, dialect):
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+def explain(connection, statement):
+    """(index names used, plan text) for ``statement`` on the connection's database."""
+    dialect = connection.dialect
+    sql = _sql(statement, dialect)
+    if dialect.name == 'sqlite':
+        lines = [row[-1] for row in connection.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+        used = set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', '\n'.join(lines)))
+    elif dialect.name == 'mysql':
+        rows = connection.execute(text('EXPLAIN ' + sql)).mappings().all()
+        used = {row['key'] for row in rows if row['key']}
+        lines = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+    elif dialect.name == 'postgresql':
+        lines = [row[0] for row in connection.execute(text('EXPLAIN ' + sql))]
+        used = set(re.findall(r'Index (?:Only )?Scan (?:Backward )?using (\w+)|Bitmap Index Scan on (\w+)', '\n'.join(lines)))
+        used = {name for pair in used for name in pair if name}
+    else:
+        raise NotImplementedError(f'No EXPLAIN support for {dialect.name}')
+    return used, '; '.join(lines)
+
+
+def index_columns(connection, table_name):
+    """{index name: [column, ...]} for every index on the table, including constraint indexes."""
+    if connection.dialect.name == 'sqlite':
+        return {
+            row[1]: [info[2] for info in connection.execute(text(f'PRAGMA index_info("{row[1]}")'))]
+            for row in connection.execute(text(f'PRAGMA index_list("{table_name}")'))
+        }
+    inspector = inspect(connection)
+    indexes = {index['name']: index['column_names'] for index in inspector.get_indexes(table_name)}
+    indexes.update(
+        (constraint['name'], constraint['column_names'])
+        for constraint in inspector.get_unique_constraints(table_name)
+    )
+    primary = inspector.get_pk_constraint(table_name)
+    indexes['PRIMARY' if connection.dialect.name == 'mysql' else primary['name']] = primary['constrained_columns']
+    return indexes
+
+
+def check_plans(engine):
+    """[(query name, uses expected index, detail)] for every hot query."""
+    results = []
+    with engine.connect() as connection:
+        for name, statement, leading in HOT_QUERIES:
+            table_name = statement.get_final_froms()[0].name
+            columns = index_columns(connection, table_name)
+            used, plan = explain(connection, statement)
+            matches = [index for index in used if tuple(columns.get(index, ())[:len(leading)]) == leading]
+            if matches:
+                results.append((name, True, f"uses {matches[0]} ({', '.join(columns[matches[0]])})"))
+            else:
+                results.append((name, False, f"expected an index on ({', '.join(leading)}), plan: {plan}"))
+    return results
@@ -0,0 +1,30 @@
+from app import db
+from app.cache import get_cache
+from app.models import Course, Department
+
+DEPARTMENTS = 'departments'
+COURSES = 'courses'
+
+# Cached reference data. Loaders return plain rows rather than ORM instances so a
+# cached value is never bound to, or expired by, another request's session.
+# Admin routes that write departments or courses call app.cache.invalidate()
+# with the namespace after committing.
+
+
+def departments():
+    """All departments ordered by name, as rows with departmentID/name/location/contactInfo."""
+    return get_cache().get_or_load(DEPARTMENTS, 'all', lambda: (
+        db.session.query(
+            Department.departmentID, Department.name, Department.location, Department.contactInfo
+        ).order_by(Department.name).all()
+    ))
+
+
+def courses():
+    """All courses ordered by ID, as rows carrying the catalog columns."""
+    return get_cache().get_or_load(COURSES, 'all', lambda: (
+        db.session.query(
+            Course.courseID, Course.courseName, Course.departmentID,
+            Course.duration, Course.description, Course.courseFee
+        ).order_by(Course.courseID).all()
+    ))
@@ -0,0 +1,128 @@
+import random
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+# Read replicas are registered as SQLAlchemy binds named replica0, replica1, ...
+REPLICA_BIND_PREFIX = 'replica'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Session key holding the time until which this client reads from the primary
+PRIMARY_UNTIL = '_db_primary_until'
+
+# Engine options set from DB_POOL_* config, and which of them only apply to
+# pools that hold several connections (not SQLite's in-memory StaticPool)
+POOL_OPTIONS = {
+    'pool_size': 'DB_POOL_SIZE',
+    'max_overflow': 'DB_MAX_OVERFLOW',
+    'pool_timeout': 'DB_POOL_TIMEOUT',
+    'pool_recycle': 'DB_POOL_RECYCLE',
+    'pool_pre_ping': 'DB_POOL_PRE_PING',
+}
+QUEUE_POOL_ONLY = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def _is_memory_sqlite(url):
+    url = str(url)
+    return url.startswith('sqlite') and (url in ('sqlite://', 'sqlite:///') or ':memory:' in url)
+
+
+def engine_options(config, url):
+    """Pool options for an engine on ``url`` from the DB_POOL_* settings."""
+    options = {}
+    for option, key in POOL_OPTIONS.items():
+        value = config.get(key)
+        if value is None or (option in QUEUE_POOL_ONLY and _is_memory_sqlite(url)):
+            continue
+        options[option] = value
+    return options
+
+
+def configure_engines(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS and SQLALCHEMY_BINDS before db.init_app.
+
+    Explicit SQLALCHEMY_ENGINE_OPTIONS entries win over the DB_POOL_* defaults.
+    Each URL in DB_REPLICA_URIS becomes a bind with the same pool options.
+    """
+    config = app.config
+    primary = config.get('SQLALCHEMY_DATABASE_URI')
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(engine_options(config, primary), **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    replicas = []
+    for index, url in enumerate(config.get('DB_REPLICA_URIS') or ()):
+        key = f'{REPLICA_BIND_PREFIX}{index}'
+        binds[key] = dict(engine_options(config, url), url=url)
+        replicas.append(key)
+    config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['db_replicas'] = replicas
+
+
+def _is_read(clause):
+    # ORM queries, lazy loads and session.get() all arrive as a Select
+    return (
+        clause is not None
+        and getattr(clause, 'is_select', False)
+        and getattr(clause, '_for_update_arg', None) is None
+    )
+
+
+class RoutingSession(Session):
+    """Session that sends a read-only request's SELECTs to a replica.
+
+    Inside a GET/HEAD request that picked a replica, plain SELECTs go to it;
+    anything else (a flush, Core INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE,
+    text()) goes to the primary and keeps the rest of the request on the
+    primary, so a request always reads its own writes. Outside a request, or
+    with no replicas configured, it behaves like the stock session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replica = g.get('db_replica')
+            if replica is not None:
+                if not self._flushing and _is_read(clause):
+                    return self._db.engines[replica]
+                g.db_replica = None
+                g.db_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def use_primary():
+    """Send this request's queries to the primary inside the block.
+
+    Used for reads whose result outlives the request, such as cache fills,
+    which must not capture a lagging replica's view.
+    """
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('db_replica')
+    g.db_replica = None
+    try:
+        yield
+    finally:
+        if not g.get('db_wrote'):
+            g.db_replica = previous
+
+
+def _choose_replica():
+    replicas = current_app.extensions.get('db_replicas')
+    g.db_replica = None
+    if replicas and request.method in READ_METHODS and session.get(PRIMARY_UNTIL, 0) < time.time():
+        g.db_replica = random.choice(replicas)
+
+
+def _stick_to_primary(response):
+    # After a write, this client reads from the primary until replicas have caught up
+    seconds = current_app.config.get('DB_REPLICA_STICKY_SECONDS')
+    if current_app.extensions.get('db_replicas') and seconds:
+        if request.method not in READ_METHODS or g.get('db_wrote'):
+            session[PRIMARY_UNTIL] = time.time() + seconds
+    return response
+
+
+def init_app(app):
+    app.before_request(_choose_replica)
+    app.after_request(_stick_to_primary)
@@ -0,0 +1,231 @@
+import re
+from collections import defaultdict
+from itertools import chain
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup
+from sqlalchemy import column, delete, event, select, text
+from app import db
+from app.models import Course, Department, Person, Professor, SearchDocument, Student
+from app.replicas import RoutingSession
+from app.upsert import upsert
+
+# Full-text search over people, courses and departments.
+#
+# Each searchable row has one SearchDocument: the name as title, and email,
+# phone, student/professor ID or description as body. ORM writes to those
+# models refresh their documents from an after_flush hook, in the same
+# transaction; Core bulk writes call reindex() themselves. Queries go to the
+# database's own full-text index (see SearchDocument in app.models), and
+# `flask search rebuild` regenerates every document.
+
+# (admin endpoint, URL argument) for each kind of SearchDocument.link
+LINKS = {
+    'student': ('admin.edit_student', 'studID'),
+    'professor': ('admin.edit_professor', 'profID'),
+    'user': ('admin.edit_user', 'person_id'),
+    'course': ('admin.edit_course', 'courseID'),
+    'department': ('admin.edit_department', 'departmentID'),
+}
+MAX_TERMS = 8
+BATCH_SIZE = 1000
+_TERM = re.compile(r'\w+')
+
+
+class SearchResult:
+    """One ranked match; ``url`` is the admin page of the matched row."""
+
+    def __init__(self, kind, ref, link, title, body):
+        self.kind = kind
+        self.ref = ref
+        self.link = link
+        self.title = title
+        self.body = body
+
+    @property
+    def url(self):
+        target, _, value = self.link.partition(':')
+        endpoint, argument = LINKS[target]
+        return url_for(endpoint, **{argument: value})
+
+    def to_dict(self):
+        return {'kind': self.kind, 'label': self.title, 'detail': self.body, 'url': self.url}
+
+
+# Documents ------------------------------------------------------------------
+
+def _people(connection, refs=None):
+    query = (
+        select(Person.person_id, Person.name, Person.email, Person.phone_no, Person.role, Student.studID, Professor.profID)
+        .outerjoin(Student, Student.person_id == Person.person_id)
+        .outerjoin(Professor, Professor.person_id == Person.person_id)
+    )
+    if refs is not None:
+        query = query.where(Person.person_id.in_([int(ref) for ref in refs]))
+    seen = set()
+    for row in connection.execute(query):
+        if row.person_id in seen:
+            continue
+        seen.add(row.person_id)
+        if row.studID:
+            link = f'student:{row.studID}'
+        elif row.profID:
+            link = f'professor:{row.profID}'
+        else:
+            link = f'user:{row.person_id}'
+        body = ' '.join(value for value in (row.email, row.phone_no, row.studID, row.profID, row.role) if value)
+        yield {'kind': 'person', 'ref': str(row.person_id), 'link': link, 'title': row.name, 'body': body}
+
+
+def _courses(connection, refs=None):
+    query = select(Course.courseID, Course.courseName, Course.departmentID, Course.description)
+    if refs is not None:
+        query = query.where(Course.courseID.in_(list(refs)))
+    for row in connection.execute(query):
+        body = ' '.join(value for value in (row.courseID, row.departmentID, row.description) if value)
+        yield {'kind': 'course', 'ref': row.courseID, 'link': f'course:{row.courseID}', 'title': row.courseName, 'body': body}
+
+
+def _departments(connection, refs=None):
+    query = select(Department.departmentID, Department.name, Department.location)
+    if refs is not None:
+        query = query.where(Department.departmentID.in_(list(refs)))
+    for row in connection.execute(query):
+        body = ' '.join(value for value in (row.departmentID, row.location) if value)
+        yield {'kind': 'department', 'ref': row.departmentID, 'link': f'department:{row.departmentID}',
+               'title': row.name, 'body': body}
+
+
+DOCUMENTS = {'person': _people, 'course': _courses, 'department': _departments}
+
+
+def _write(connection, documents):
+    table = SearchDocument.__table__
+    batch, written = [], 0
+    for document in chain(documents, [None]):
+        if document is not None:
+            batch.append(document)
+        if batch and (document is None or len(batch) >= BATCH_SIZE):
+            connection.execute(upsert(table, ('kind', 'ref'), ('link', 'title', 'body'), rows=batch))
+            written += len(batch)
+            batch = []
+    return written
+
+
+def reindex(connection, kind, refs):
+    """Bring the documents of ``refs`` up to date; refs whose row is gone lose their document."""
+    refs = {str(ref) for ref in refs}
+    if not refs:
+        return 0
+    table = SearchDocument.__table__
+    documents = list(DOCUMENTS[kind](connection, refs))
+    gone = refs - {document['ref'] for document in documents}
+    if gone:
+        connection.execute(delete(table).where(table.c.kind == kind, table.c.ref.in_(gone)))
+    return _write(connection, documents)
+
+
+def rebuild(connection):
+    """Regenerate every document; returns how many were written."""
+    connection.execute(delete(SearchDocument.__table__))
+    return sum(_write(connection, documents(connection)) for documents in DOCUMENTS.values())
+
+
+def _refs_changed(session):
+    changed = defaultdict(set)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Person, Student, Professor)):
+            changed['person'].add(obj.person_id)
+        elif isinstance(obj, Course):
+            changed['course'].add(obj.courseID)
+        elif isinstance(obj, Department):
+            changed['department'].add(obj.departmentID)
+    return changed
+
+
+def _after_flush(session, flush_context):
+    changed = _refs_changed(session)
+    if changed:
+        connection = session.connection()
+        for kind, refs in changed.items():
+            reindex(connection, kind, refs)
+
+
+# Queries --------------------------------------------------------------------
+
+def terms(query):
+    """Lower-cased word terms of a user query, at most MAX_TERMS."""
+    return [term.lower() for term in _TERM.findall(query or '')][:MAX_TERMS]
+
+
+def _sqlite(words, kind, ranked):
+    # Every word must match, each as a prefix; bm25 weighs a title hit ten times a body hit
+    sql = ('SELECT d.kind, d.ref, d.link, d.title, d.body FROM SearchIndex '
+           'JOIN SearchDocument d ON d.docID = SearchIndex.rowid WHERE SearchIndex MATCH :match')
+    if kind:
+        sql += ' AND d.kind = :kind'
+    if ranked:
+        sql += ' ORDER BY bm25(SearchIndex, 10.0, 1.0)'
+    return sql, {'match': ' '.join(f'"{word}"*' for word in words)}
+
+
+def _mysql(words, kind, ranked):
+    sql = 'SELECT kind, ref, link, title, body FROM SearchDocument WHERE MATCH(title, body) AGAINST(:match IN BOOLEAN MODE)'
+    if kind:
+        sql += ' AND kind = :kind'
+    if ranked:
+        sql += (' ORDER BY MATCH(title) AGAINST(:match IN BOOLEAN MODE) * 2'
+                ' + MATCH(title, body) AGAINST(:match IN BOOLEAN MODE) DESC')
+    return sql, {'match': ' '.join(f'+{word}*' for word in words)}
+
+
+def _fallback(words, kind, ranked):
+    # Databases without a full-text index scan with LIKE; fine for development only
+    sql = 'SELECT kind, ref, link, title, body FROM SearchDocument WHERE ' + ' AND '.join(
+        f'(lower(title) LIKE :w{i} OR lower(body) LIKE :w{i})' for i in range(len(words))
+    )
+    if kind:
+        sql += ' AND kind = :kind'
+    return sql + ' ORDER BY title', {f'w{i}': f'%{word}%' for i, word in enumerate(words)}
+
+
+QUERIES = {'sqlite': _sqlite, 'mysql': _mysql}
+
+
+def search(query, kind=None, limit=None, ranked=True):
+    """SearchResults for ``query``, best first unless ``ranked`` is False.
+
+    Unranked searches stop at the first ``limit`` matches in index order,
+    which keeps broad prefixes as fast as narrow ones; autocomplete uses them.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    sql, params = QUERIES.get(db.engine.dialect.name, _fallback)(words, kind, ranked)
+    params.update(kind=kind, limit=limit or current_app.config.get('SEARCH_RESULTS_LIMIT', 50))
+    # A textual SELECT, so the routing session can send it to a read replica
+    statement = text(sql + ' LIMIT :limit').columns(*(column(name) for name in ('kind', 'ref', 'link', 'title', 'body')))
+    return [SearchResult(*row) for row in db.session.execute(statement, params)]
+
+
+def autocomplete(query, limit=None):
+    """Up to SEARCH_AUTOCOMPLETE_LIMIT prefix matches for a search box; needs two characters."""
+    if len((query or '').strip()) < 2:
+        return []
+    return search(query, limit=limit or current_app.config.get('SEARCH_AUTOCOMPLETE_LIMIT', 10), ranked=False)
+
+
+def init_app(app):
+    if not event.contains(RoutingSession, 'after_flush', _after_flush):
+        event.listen(RoutingSession, 'after_flush', _after_flush)
+
+
+search_cli = AppGroup('search', help='Search index commands.')
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Regenerate every search document from the source tables."""
+    with db.engine.begin() as connection:
+        count = rebuild(connection)
+    click.echo(f'Indexed {count} documents.')
@@ -5,3 +5,35 @@ setTimeout(() => {
         setTimeout(() => flashMessages.remove(), 500);
     }
 }, 3000);
+
+
+// Admin search box: suggestions come from the autocomplete endpoint; picking one opens it
+const searchInput = document.querySelector('input[data-autocomplete-url]');
+if (searchInput) {
+    const suggestions = document.getElementById(searchInput.getAttribute('list'));
+    let urls = {};
+    let timer = null;
+    searchInput.addEventListener('input', () => {
+        if (urls[searchInput.value]) {
+            window.location = urls[searchInput.value];
+            return;
+        }
+        const q = searchInput.value.trim();
+        clearTimeout(timer);
+        if (q.length < 2) return;
+        timer = setTimeout(() => {
+            fetch(`${searchInput.dataset.autocompleteUrl}?q=${encodeURIComponent(q)}`)
+                .then(response => response.json())
+                .then(results => {
+                    urls = {};
+                    suggestions.innerHTML = '';
+                    results.forEach(result => {
+                        const option = document.createElement('option');
+                        option.value = `${result.label} (${result.detail})`;
+                        urls[option.value] = result.url;
+                        suggestions.appendChild(option);
+                    });
+                });
+        }, 150);
+    });
+}
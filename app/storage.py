@@ -0,0 +1,357 @@
+import hashlib
+import io
+import mimetypes
+import os
+import tempfile
+import threading
+import zipfile
+from abc import ABC, abstractmethod
+from datetime import datetime
+from urllib.parse import quote
+import click
+from flask import abort, current_app, send_file, stream_with_context
+from flask.cli import AppGroup
+from werkzeug.utils import import_string, secure_filename
+from app import db
+from app.models import Submission
+
+REF_PREFIX = 'sha256:'
+CHUNK_SIZE = 64 * 1024
+# ZIP headers cannot hold dates before 1980; also stamped on entries with no submittedat
+ZIP_EPOCH = datetime(1980, 1, 1)
+
+# Submission.filepath holds a reference of the form "sha256:<hex digest>/<filename>".
+# The digest addresses the stored content and the filename is what the student
+# uploaded. Rows written before content-addressed storage hold a plain path instead.
+
+
+def make_ref(digest, filename):
+    return f'{REF_PREFIX}{digest}/{filename[:150]}'
+
+
+def parse_ref(ref):
+    """Return (digest, filename); digest is None for legacy plain-path references."""
+    if ref and ref.startswith(REF_PREFIX):
+        digest, _, filename = ref[len(REF_PREFIX):].partition('/')
+        return digest, filename
+    return None, os.path.basename(ref or '')
+
+
+class BlobStore(ABC):
+    """Interface for content-addressed submission storage."""
+
+    @abstractmethod
+    def save(self, stream, filename):
+        """Store ``stream`` and return its reference; identical content is stored once."""
+
+    @abstractmethod
+    def open(self, ref):
+        """Open the content behind ``ref`` for binary reading."""
+
+    @abstractmethod
+    def size(self, ref):
+        """Size in bytes of the content behind ``ref``."""
+
+    def local_path(self, ref):
+        """Filesystem path of the content if it lives on local disk, else None."""
+        return None
+
+    @abstractmethod
+    def delete(self, digest):
+        """Remove the blob with ``digest``; a missing blob is not an error."""
+
+    @abstractmethod
+    def digests(self):
+        """Iterate over the digests of every stored blob."""
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs on local disk, sharded as <root>/ab/cd/abcd... by their SHA-256.
+
+    Uploads are streamed to a temporary file in the same filesystem while being
+    hashed, then renamed into place, so content is never held in memory and a
+    partially written file is never visible under its final name.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._tmp = os.path.join(root, 'tmp')
+        os.makedirs(self._tmp, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def save(self, stream, filename):
+        sha = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    sha.update(chunk)
+                    out.write(chunk)
+            digest = sha.hexdigest()
+            path = self._path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return make_ref(digest, filename)
+
+    def local_path(self, ref):
+        digest, _ = parse_ref(ref)
+        return self._path(digest) if digest else ref
+
+    def open(self, ref):
+        return open(self.local_path(ref), 'rb')
+
+    def size(self, ref):
+        return os.path.getsize(self.local_path(ref))
+
+    def delete(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def digests(self):
+        for level1 in os.listdir(self.root):
+            if level1 == 'tmp' or len(level1) != 2:
+                continue
+            for dirpath, _, filenames in os.walk(os.path.join(self.root, level1)):
+                yield from filenames
+
+
+class MemoryBlobStore(BlobStore):
+    """In-process stand-in for an object store (development and tests)."""
+
+    def __init__(self, root=None):
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    def save(self, stream, filename):
+        sha = hashlib.sha256()
+        buffer = io.BytesIO()
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+            buffer.write(chunk)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._blobs.setdefault(digest, buffer.getvalue())
+        return make_ref(digest, filename)
+
+    def open(self, ref):
+        digest, _ = parse_ref(ref)
+        if digest is None:
+            return open(ref, 'rb')
+        with self._lock:
+            return io.BytesIO(self._blobs[digest])
+
+    def size(self, ref):
+        digest, _ = parse_ref(ref)
+        if digest is None:
+            return os.path.getsize(ref)
+        with self._lock:
+            return len(self._blobs[digest])
+
+    def delete(self, digest):
+        with self._lock:
+            self._blobs.pop(digest, None)
+
+    def digests(self):
+        with self._lock:
+            return list(self._blobs)
+
+
+BACKENDS = {
+    'local': LocalBlobStore,
+    'memory': MemoryBlobStore,
+}
+
+
+def get_store():
+    return current_app.extensions['submission_store']
+
+
+def save_upload(file):
+    """Store an uploaded werkzeug FileStorage and return its reference."""
+    return get_store().save(file.stream, secure_filename(file.filename) or 'upload')
+
+
+def _accel_location(store, ref):
+    """URL nginx should serve ``ref`` from, when X-Accel-Redirect offload is configured."""
+    prefix = current_app.config.get('SUBMISSION_ACCEL_REDIRECT_PREFIX')
+    path = store.local_path(ref)
+    if not prefix or not path or not isinstance(store, LocalBlobStore) or parse_ref(ref)[0] is None:
+        return None
+    relative = os.path.relpath(path, store.root).replace(os.sep, '/')
+    return prefix.rstrip('/') + '/' + quote(relative)
+
+
+def send_blob(ref, download_name):
+    """Send one stored file as an attachment without copying it through Python.
+
+    With SUBMISSION_ACCEL_REDIRECT_PREFIX set, nginx serves the file from an
+    internal location (X-Accel-Redirect) and handles Range itself. Otherwise
+    send_file streams it with conditional/Range support, and the WSGI server's
+    file_wrapper (sendfile) or USE_X_SENDFILE take over where available.
+    """
+    store = get_store()
+    digest, _ = parse_ref(ref)
+    location = _accel_location(store, ref)
+    if location:
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = location
+        response.headers['Content-Type'] = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        return response
+
+    try:
+        path = store.local_path(ref)
+        source = path if path else store.open(ref)
+        # Content-addressed blobs never change, so the digest is a perfect ETag
+        return send_file(source, as_attachment=True, download_name=download_name, conditional=True, etag=digest or True)
+    except (FileNotFoundError, KeyError):
+        current_app.logger.warning('Submission blob %s is missing', ref)
+        abort(404)
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that hands written bytes back to the caller."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_date_time(modified):
+    return max(modified or ZIP_EPOCH, ZIP_EPOCH).timetuple()[:6]
+
+
+def _zip_chunks(store, entries):
+    sink = _ZipSink()
+    # Stored, not deflated: submissions are mostly already-compressed documents
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, ref, modified in entries:
+            try:
+                source = store.open(ref)
+            except (FileNotFoundError, KeyError):
+                current_app.logger.warning('Skipping missing submission blob %s', ref)
+                continue
+            info = zipfile.ZipInfo(arcname, date_time=_zip_date_time(modified))
+            with source, archive.open(info, 'w', force_zip64=True) as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def zip_response(entries, download_name):
+    """Stream a ZIP of ``entries`` ((arcname, ref, modified datetime or None), ...) as it is built.
+
+    Nothing is buffered beyond one chunk and no temporary file is written. When
+    SUBMISSION_ZIP_OFFLOAD is on (nginx mod_zip plus X-Accel-Redirect), only a
+    manifest is sent and nginx assembles the archive itself.
+    """
+    store = get_store()
+    entries = list(entries)
+
+    if current_app.config.get('SUBMISSION_ZIP_OFFLOAD'):
+        locations = [_accel_location(store, ref) for _, ref, _ in entries]
+        if all(locations):
+            lines = []
+            for (arcname, ref, _), location in zip(entries, locations):
+                try:
+                    size = store.size(ref)
+                except (FileNotFoundError, KeyError):
+                    current_app.logger.warning('Skipping missing submission blob %s', ref)
+                    continue
+                lines.append(f'- {size} {location} {arcname}\n')
+            response = current_app.response_class(''.join(lines), mimetype='text/plain')
+            response.headers['X-Archive-Files'] = 'zip'
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+            return response
+
+    response = current_app.response_class(
+        stream_with_context(chunk for chunk in _zip_chunks(store, entries) if chunk),
+        mimetype='application/zip',
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response
+
+
+def init_app(app):
+    backend = app.config.get('SUBMISSION_STORAGE_BACKEND', 'local')
+    backend = BACKENDS.get(backend) or import_string(backend)
+    root = app.config.get('SUBMISSION_STORAGE_ROOT') or os.path.join(app.config['UPLOAD_FOLDER'], 'blobs')
+    app.extensions['submission_store'] = backend(root)
+
+
+submissions_cli = AppGroup('submissions', help='Submission storage commands.')
+
+
+@submissions_cli.command('migrate')
+def migrate_command():
+    """Move legacy flat-file submissions into the content-addressed store."""
+    store = get_store()
+    moved = missing = 0
+    migrated = {}
+    for submission in Submission.query.filter(~Submission.filepath.startswith(REF_PREFIX)):
+        path = submission.filepath
+        if path in migrated:
+            submission.filepath = migrated[path]
+            db.session.commit()
+            moved += 1
+            continue
+        if not os.path.isfile(path):
+            missing += 1
+            click.echo(f'Submission {submission.submissionID}: {path} not found', err=True)
+            continue
+        # Legacy names are "<studID>_<examID>_<original name>"
+        prefix = f'{submission.studID}_{submission.examID}_'
+        filename = os.path.basename(path)
+        filename = filename[len(prefix):] if filename.startswith(prefix) else filename
+        with open(path, 'rb') as f:
+            submission.filepath = migrated[path] = store.save(f, filename)
+        db.session.commit()
+        os.remove(path)
+        moved += 1
+    click.echo(f'Migrated {moved} submissions, {missing} missing files.')
+
+
+@submissions_cli.command('gc')
+@click.option('--dry-run', is_flag=True, help='Only report unreferenced blobs.')
+def gc_command(dry_run):
+    """Delete stored blobs that no Submission references any more.
+
+    Run it when no uploads are in flight: a blob saved by a request that has not
+    committed its Submission yet looks unreferenced.
+    """
+    store = get_store()
+    referenced = {
+        parse_ref(ref)[0]
+        for (ref,) in db.session.query(Submission.filepath).filter(Submission.filepath.startswith(REF_PREFIX))
+    }
+    removed = 0
+    for digest in list(store.digests()):
+        if digest not in referenced:
+            removed += 1
+            if not dry_run:
+                store.delete(digest)
+    click.echo(f"{'Would remove' if dry_run else 'Removed'} {removed} unreferenced blobs.")
@@ -1,30 +1,47 @@
-import os
-from flask import render_template, request, redirect, url_for, flash, session, current_app
+from flask import render_template, request, redirect, url_for, flash, session, current_app, g, jsonify
 from functools import wraps
 from datetime import datetime
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm import lazyload
 from app.student import student
 from app.models import db, Student, Enrollment, Course, Exam, Submission, Grade, Attendance
+from app.query_budget import query_budget
+from app.attendance import student_summary
+from app.storage import save_upload
+from app.gradebook import course_gradebook, invalidate_gradebook
+from app.enrollment import drop_enrollment
+from app.student_overview import student_overview
 
 def student_required(f):
+    """Allow students only, and load the logged-in Student once per request into g.student."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if session.get('user_role') != 'Student': 
             flash('Unauthorized access! Student only.', 'danger')
             return redirect(url_for('main.profile')) 
+        if g.get('student') is None:
+            g.student = Student.query.filter_by(person_id=session['user_id']).first_or_404()
         return f(*args, **kwargs)
     return decorated_function
 
 @student.route('/dashboard')
 @student_required
+@query_budget(5)
 def dashboard():
-    return render_template('Sdashboard.html')
+    overview = student_overview(g.student.studID)
+    return render_template('Sdashboard.html', overview=overview)
+
+@student.route('/summary', methods=['GET'])
+@student_required
+@query_budget(5)
+def summary():
+    # The dashboard's data as JSON: enrollments, upcoming exams, latest grades, attendance
+    return jsonify(student_overview(g.student.studID).to_dict())
 
 @student.route('/enrolled_courses', methods=['GET'])
 @student_required
+@query_budget(2)
 def enrolled_courses():
-    # Fetch the logged-in student's studID
-    student = Student.query.filter_by(person_id=session['user_id']).first_or_404()
+    student = g.student
 
     # Fetch enrollments for the student
     enrollments = (
@@ -51,15 +68,14 @@ def drop_course(enrollmentID):
     enrollment = Enrollment.query.get_or_404(enrollmentID)
 
     # Check if the current user owns the enrollment
-    student = Student.query.filter_by(person_id=session['user_id']).first()
-    if enrollment.studID != student.studID:
+    if enrollment.studID != g.student.studID:
         flash('You are not authorized to drop this course.', 'danger')
         return redirect(url_for('student.enrolled_courses'))
 
     try:
-        enrollment.status = 'Dropped'
-        enrollment.dropDate = datetime.utcnow()
+        drop_enrollment(enrollment)
         db.session.commit()
+        invalidate_gradebook(enrollment.courseID)
         flash('Course dropped successfully.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -69,15 +85,13 @@ def drop_course(enrollmentID):
 
 @student.route('/courses/<string:courseID>/exams', methods=['GET'])
 @student_required
+@query_budget(3)
 def view_exams(courseID):
-    # Get the logged-in student's studID
-    student = Student.query.filter_by(person_id=session['user_id']).first_or_404()
-    print(f"Retrieved studID: {student.studID}")
+    student = g.student
 
     # Check if the student is enrolled in the course
     enrollment = Enrollment.query.filter_by(studID=student.studID.strip(), courseID=courseID.strip()).first()
-    print(f"Enrollment found: {enrollment}")
-    
+
     if not enrollment:
         flash("You are not enrolled in this course.", "danger")
         return redirect(url_for('student.enrolled_courses'))
@@ -96,7 +110,7 @@ def submit_assignment(examID):
         flash('This exam is not an assignment.', 'danger')
         return redirect(url_for('student.view_exams', courseID=exam.courseID))
 
-    student = Student.query.filter_by(person_id=session['user_id']).first_or_404()
+    student = g.student
 
     if request.method == 'POST':
         if 'file' not in request.files or request.files['file'].filename == '':
@@ -104,20 +118,28 @@ def submit_assignment(examID):
             return redirect(request.url)
 
         file = request.files['file']
-        filename = secure_filename(f"{student.studID}_{examID}_{file.filename}")
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-
-        print(f"Saving file to: {filepath}")  # Debugging output
 
         try:
-            file.save(filepath)
-            new_submission = Submission(
-                examID=examID,
-                studID=student.studID,
-                filepath=filepath,
-                submittedat=datetime.utcnow()
+            # Content-addressed: identical files are stored once, the row keeps the reference
+            filepath = save_upload(file)
+
+            # A resubmission replaces the student's previous submission for this exam
+            submission = (
+                Submission.query.filter_by(examID=examID, studID=student.studID)
+                .order_by(Submission.submittedat.desc())
+                .first()
             )
-            db.session.add(new_submission)
+            if submission:
+                submission.filepath = filepath
+                submission.submittedat = datetime.utcnow()
+            else:
+                submission = Submission(
+                    examID=examID,
+                    studID=student.studID,
+                    filepath=filepath,
+                    submittedat=datetime.utcnow()
+                )
+                db.session.add(submission)
             db.session.commit()
             flash('Assignment submitted successfully!', 'success')
             return redirect(url_for('student.view_exams', courseID=exam.courseID))
@@ -129,9 +151,9 @@ def submit_assignment(examID):
 
 @student.route('/exams/<int:examID>/marks', methods=['GET'])
 @student_required
+@query_budget(2)
 def view_marks(examID):
-    # Get the current student based on the logged-in user
-    student = Student.query.filter_by(person_id=session['user_id']).first_or_404()
+    student = g.student
 
     # Query grade for the student and include course details
     grade = (
@@ -148,23 +170,44 @@ def view_marks(examID):
 
     return render_template('see_marks.html', grade=grade)
 
+@student.route('/courses/<string:courseID>/grades', methods=['GET'])
+@student_required
+def view_course_grades(courseID):
+    student = g.student
+    course = Course.query.get_or_404(courseID)
+
+    gradebook = course_gradebook(courseID)
+    row = gradebook.row(student.studID)
+    if not row:
+        flash('No grades available for this course.', 'info')
+        return redirect(url_for('student.enrolled_courses'))
+
+    return render_template('course_grades.html', course=course, gradebook=gradebook, row=row)
+
 @student.route('/courses/<string:courseID>/attendance', methods=['GET'])
 @student_required
+@query_budget(3)
 def view_attendance(courseID):
-    # Get the current student based on the logged-in user
-    student = Student.query.filter_by(person_id=session['user_id']).first_or_404()
+    student = g.student
 
-    # Query attendance records for the student in the given course
-    attendance_records = Attendance.query.filter_by(studID=student.studID, courseID=courseID).all()
+    # Totals come from the maintained summary row instead of counting every record
+    summary = student_summary(student.studID, courseID)
 
-    if not attendance_records:
+    if not summary or not summary.totalClasses:
         flash('No attendance records found for this course.', 'info')
         return redirect(url_for('student.enrolled_courses'))
 
-    # Calculate attendance statistics
-    total_classes = len(attendance_records)
-    attended_classes = sum(record.status for record in attendance_records)
-    attendance_percentage = (attended_classes / total_classes) * 100 if total_classes > 0 else 0
+    # Query attendance records for the student in the given course
+    attendance_records = (
+        Attendance.query.filter_by(studID=student.studID, courseID=courseID)
+        .options(lazyload('*'))  # the page only reads date/status
+        .order_by(Attendance.date)
+        .all()
+    )
+
+    total_classes = summary.totalClasses
+    attended_classes = summary.attendedClasses
+    attendance_percentage = summary.percentage
 
     return render_template(
         'view_attendance.html',
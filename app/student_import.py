@@ -0,0 +1,216 @@
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Person, Student
+from app.passwords import DEFAULT_ROUNDS, PASSWORD_PATTERN, hash_password
+from app.search import reindex
+
+REQUIRED_COLUMNS = ('name', 'email', 'password', 'studID')
+GENDERS = ('Male', 'Female', 'Other', 'Prefer not to say')
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+
+class RowError(ValueError):
+    pass
+
+
+def _parse_row(row):
+    """Validate one CSV row and return (person fields, studID, raw password)."""
+    missing = [column for column in REQUIRED_COLUMNS if not (row.get(column) or '').strip()]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+
+    email = row['email'].strip().lower()
+    if not re.match(EMAIL_PATTERN, email):
+        raise RowError(f'invalid email {email!r}')
+    if not re.match(PASSWORD_PATTERN, row['password']):
+        raise RowError('password does not meet the password policy')
+
+    person = {
+        'name': row['name'].strip()[:100],
+        'email': email,
+        'role': 'Student',
+        'phone_no': (row.get('phone_no') or '').strip() or None,
+        'gender': (row.get('gender') or '').strip() or 'Prefer not to say',
+        'age': None,
+        'dob': None,
+    }
+    if person['gender'] not in GENDERS:
+        raise RowError(f"invalid gender {person['gender']!r}")
+    if (row.get('age') or '').strip():
+        try:
+            person['age'] = int(row['age'])
+        except ValueError:
+            raise RowError(f"invalid age {row['age']!r}")
+    if (row.get('dob') or '').strip():
+        try:
+            person['dob'] = datetime.strptime(row['dob'].strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise RowError(f"invalid dob {row['dob']!r}, expected YYYY-MM-DD")
+
+    studID = row['studID'].strip()
+    if len(studID) > 20:
+        raise RowError('studID is longer than 20 characters')
+    return person, studID, row['password']
+
+
+def _existing(column, values):
+    values = [v for v in values if v]
+    if not values:
+        return set()
+    return {value for (value,) in db.session.query(column).filter(column.in_(values))}
+
+
+def _insert_batch(batch):
+    """Insert a validated batch: Person rows first, then their Student rows."""
+    now = datetime.utcnow()
+    db.session.execute(insert(Person), [dict(person, createdAt=now, updatedAt=now) for _, person, _ in batch])
+    ids = dict(
+        db.session.query(Person.email, Person.person_id)
+        .filter(Person.email.in_([person['email'] for _, person, _ in batch]))
+    )
+    db.session.execute(insert(Student), [
+        {'person_id': ids[person['email']], 'studID': studID, 'createdAt': now, 'updatedAt': now}
+        for _, person, studID in batch
+    ])
+    # Core inserts skip the ORM hook that keeps search documents current
+    reindex(db.session.connection(), 'person', ids.values())
+
+
+def _import_batch(batch, errors):
+    """Commit ``batch`` in one transaction, falling back to row-by-row on conflicts."""
+    try:
+        _insert_batch(batch)
+        db.session.commit()
+        return len(batch)
+    except IntegrityError:
+        db.session.rollback()
+
+    imported = 0
+    for entry in batch:
+        try:
+            _insert_batch([entry])
+            db.session.commit()
+            imported += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            errors.append((entry[0], f'rejected by the database: {e.orig}'))
+    return imported
+
+
+def import_students(stream, batch_size=500, workers=None, rounds=None):
+    """Import students from a CSV stream.
+
+    Rows are validated, checked against existing emails/phones/studIDs, hashed on
+    a process pool and inserted ``batch_size`` at a time, one transaction per
+    batch. Returns (imported count, [(line number, message), ...]).
+    """
+    rounds = rounds or current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS)
+    workers = workers or os.cpu_count() or 1
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise click.UsageError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    errors = []
+    imported = 0
+    seen_emails, seen_phones, seen_ids = set(), set(), set()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+
+        def flush():
+            nonlocal imported
+            if not pending:
+                return
+            emails = _existing(Person.email, [p['email'] for _, p, _, _ in pending])
+            phones = _existing(Person.phone_no, [p['phone_no'] for _, p, _, _ in pending])
+            ids = _existing(Student.studID, [s for _, _, s, _ in pending])
+            batch = []
+            for line, person, studID, password in pending:
+                if person['email'] in emails:
+                    errors.append((line, f"email {person['email']} is already registered"))
+                elif person['phone_no'] and person['phone_no'] in phones:
+                    errors.append((line, f"phone number {person['phone_no']} is already registered"))
+                elif studID in ids:
+                    errors.append((line, f'studID {studID} already exists'))
+                else:
+                    batch.append((line, person, studID, password))
+
+            hashes = pool.map(partial(hash_password, rounds=rounds), [b[3] for b in batch],
+                              chunksize=max(1, len(batch) // (4 * workers)))
+            ready = []
+            for (line, person, studID, _), hashed in zip(batch, hashes):
+                ready.append((line, dict(person, password=hashed), studID))
+            if ready:
+                imported += _import_batch(ready, errors)
+            pending.clear()
+
+        for line, row in enumerate(reader, start=2):
+            try:
+                person, studID, password = _parse_row(row)
+            except RowError as e:
+                errors.append((line, str(e)))
+                continue
+
+            # Duplicates inside the file itself
+            if person['email'] in seen_emails:
+                errors.append((line, f"email {person['email']} appears earlier in the file"))
+                continue
+            if person['phone_no'] and person['phone_no'] in seen_phones:
+                errors.append((line, f"phone number {person['phone_no']} appears earlier in the file"))
+                continue
+            if studID in seen_ids:
+                errors.append((line, f'studID {studID} appears earlier in the file'))
+                continue
+            seen_emails.add(person['email'])
+            seen_ids.add(studID)
+            if person['phone_no']:
+                seen_phones.add(person['phone_no'])
+
+            pending.append((line, person, studID, password))
+            if len(pending) >= batch_size:
+                flush()
+        flush()
+
+    return imported, sorted(errors)
+
+
+students_cli = AppGroup('students', help='Student administration commands.')
+
+
+@students_cli.command('import')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--batch-size', default=500, show_default=True, help='Rows per transaction.')
+@click.option('--workers', type=int, default=None, help='Hashing processes (default: CPU count).')
+@click.option('--errors', 'errors_file', type=click.File('w'), default=None,
+              help='Write rejected rows as CSV (line,error) to this file.')
+def import_command(csv_file, batch_size, workers, errors_file):
+    """Import students from CSV_FILE.
+
+    Required columns: name, email, password, studID. Optional: phone_no, gender,
+    age, dob (YYYY-MM-DD).
+    """
+    imported, errors = import_students(csv_file, batch_size=batch_size, workers=workers)
+
+    if errors_file:
+        writer = csv.writer(errors_file)
+        writer.writerow(['line', 'error'])
+        writer.writerows(errors)
+    else:
+        for line, message in errors:
+            click.echo(f'line {line}: {message}', err=True)
+
+    click.echo(f'Imported {imported} students, rejected {len(errors)} rows.')
+    if errors:
+        sys.exit(1)
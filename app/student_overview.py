@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import select
+from app import db
+from app.models import AttendanceSummary, Course, Enrollment, Exam, Grade
+
+UPCOMING_EXAMS = 5
+LATEST_GRADES = 5
+
+
+class StudentOverview:
+    """Everything the student dashboard shows, read with four queries.
+
+    ``enrollments`` are (enrollmentID, courseID, courseName, semester, status,
+    paymentStatus), ``upcoming`` the next UPCOMING_EXAMS exams of active
+    courses as (examID, courseID, courseName, examType, date, location),
+    ``grades`` the LATEST_GRADES most recently marked as (examID, courseID,
+    courseName, examType, grade, maxMarks, updatedAt) and ``attendance``
+    (courseID, courseName, attended, total, percentage) per course.
+    """
+
+    def __init__(self, studID, enrollments, upcoming, grades, attendance):
+        self.studID = studID
+        self.enrollments = enrollments
+        self.upcoming = upcoming
+        self.grades = grades
+        self.attendance = attendance
+
+    def to_dict(self):
+        def rows(fields, values):
+            return [
+                {field: value.isoformat() if isinstance(value, datetime) else value for field, value in zip(fields, row)}
+                for row in values
+            ]
+        return {
+            'studID': self.studID,
+            'enrollments': rows(('enrollmentID', 'courseID', 'courseName', 'semester', 'status', 'paymentStatus'), self.enrollments),
+            'upcoming_exams': rows(('examID', 'courseID', 'courseName', 'examType', 'date', 'location'), self.upcoming),
+            'latest_grades': rows(('examID', 'courseID', 'courseName', 'examType', 'grade', 'maxMarks', 'gradedAt'), self.grades),
+            'attendance': rows(('courseID', 'courseName', 'attended', 'total', 'percentage'), self.attendance),
+        }
+
+
+def student_overview(studID, now=None):
+    """Build the StudentOverview of one student."""
+    now = now or datetime.utcnow()
+
+    # Column selects keep the models' eager-loaded relationships out of these queries
+    enrollments = [tuple(row) for row in db.session.execute(
+        select(Enrollment.enrollmentID, Enrollment.courseID, Course.courseName, Enrollment.semester,
+               Enrollment.status, Enrollment.paymentStatus)
+        .join(Course, Course.courseID == Enrollment.courseID)
+        .where(Enrollment.studID == studID)
+        .order_by(Enrollment.enrollmentDate.desc())
+    )]
+    courseNames = {row[1]: row[2] for row in enrollments}
+    active = [row[1] for row in enrollments if row[4] == 'Active']
+
+    upcoming = []
+    if active:
+        upcoming = [tuple(row) for row in db.session.execute(
+            select(Exam.examID, Exam.courseID, Course.courseName, Exam.examType, Exam.date, Exam.location)
+            .join(Course, Course.courseID == Exam.courseID)
+            .where(Exam.courseID.in_(active), Exam.date >= now)
+            .order_by(Exam.date)
+            .limit(UPCOMING_EXAMS)
+        )]
+
+    grades = [tuple(row) for row in db.session.execute(
+        select(Grade.examID, Grade.courseID, Course.courseName, Exam.examType, Grade.grade, Exam.maxMarks, Grade.updatedAt)
+        .join(Exam, Exam.examID == Grade.examID)
+        .join(Course, Course.courseID == Grade.courseID)
+        .where(Grade.studID == studID)
+        .order_by(Grade.updatedAt.desc(), Grade.gradeID.desc())
+        .limit(LATEST_GRADES)
+    )]
+
+    attendance = []
+    for summary in db.session.execute(
+        select(AttendanceSummary).where(AttendanceSummary.studID == studID).order_by(AttendanceSummary.courseID)
+    ).scalars():
+        attendance.append((summary.courseID, courseNames.get(summary.courseID, summary.courseID),
+                           summary.attendedClasses, summary.totalClasses, summary.percentage))
+
+    return StudentOverview(studID, enrollments, upcoming, grades, attendance)
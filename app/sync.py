@@ -0,0 +1,196 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, event, insert, inspect, or_, select
+from app import db
+from app.models import Attendance, Enrollment, Fee, Grade, Person, Tombstone
+from app.pagination import decode_cursor, encode_cursor
+from app.replicas import RoutingSession
+
+# Change feeds for downstream mirrors.
+#
+# The feed of a synced table is its rows in (updatedAt, primary key) order,
+# read through the ix_*_updated indexes, merged with the Tombstones of its
+# deleted rows. A consumer pages through it with the returned cursor and keeps
+# the last one for its next poll, so each poll reads only what changed since.
+# Rows written in the last SYNC_SETTLE_SECONDS are held back: a transaction
+# that commits late with an earlier updatedAt would otherwise land behind a
+# cursor already handed out. Tombstones are written in the flush that deletes
+# a row, including the rows the database removes through ON DELETE CASCADE.
+# A row whose updatedAt is NULL (written around the ORM, where the column has
+# no server default) counts as changed at EPOCH: a full sync still returns it,
+# and since NULL sorts first in the (updatedAt, key) indexes the feed keeps
+# reading them in index order.
+
+SYNCED = {model.__tablename__: model for model in (Person, Enrollment, Fee, Grade, Attendance)}
+
+# A cursor is (timestamp, deleted, primary key); these columns have those types
+_CURSOR_COLUMNS = (Tombstone.deletedAt, Tombstone.tombstoneID, Tombstone.ref)
+
+# Feed position of a row with a NULL updatedAt
+EPOCH = datetime(1970, 1, 1)
+
+
+class ChangePage:
+    """One page of a change feed.
+
+    ``changes`` are (at, deleted, ref, row) in feed order, ``row`` being None
+    for a delete. ``cursor`` resumes after them (the requested cursor when
+    the page is empty), ``has_more`` says whether more changes are ready now
+    and ``until`` is the newest timestamp this page could include.
+    """
+
+    def __init__(self, changes, cursor, has_more, until):
+        self.changes = changes
+        self.cursor = cursor
+        self.has_more = has_more
+        self.until = until
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+
+def _key(model):
+    return model.__mapper__.primary_key[0]
+
+
+def _or_null(at, condition, null_matches):
+    # ``condition`` on ``at``, also matching a NULL ``at`` when EPOCH satisfies it
+    return or_(at.is_(None), condition) if null_matches else condition
+
+
+def _window(at, ref, deleted, position, since, until, nullable=False):
+    conditions = [_or_null(at, at <= until, nullable)]
+    if position is not None:
+        after_at, after_deleted, after_ref = position
+        if deleted > after_deleted:
+            conditions.append(_or_null(at, at >= after_at, nullable and EPOCH >= after_at))
+        elif deleted < after_deleted:
+            conditions.append(_or_null(at, at > after_at, nullable and EPOCH > after_at))
+        else:
+            later = _or_null(at, or_(at > after_at, and_(at == after_at, ref > after_ref)), nullable and EPOCH > after_at)
+            if nullable and EPOCH == after_at:
+                later = or_(and_(at.is_(None), ref > after_ref), later)
+            conditions.append(later)
+    elif since is not None:
+        conditions.append(_or_null(at, at >= since, nullable and EPOCH >= since))
+    return conditions
+
+
+def changes(model, columns=(), cursor=None, since=None, per_page=None, now=None):
+    """The page of ``model``'s feed after ``cursor`` (or from ``since``, or from the start).
+
+    ``columns`` are the model columns each changed row carries besides
+    updatedAt and the primary key. Raises ValueError for a malformed cursor.
+    """
+    config = current_app.config
+    per_page = max(1, min(per_page or config.get('SYNC_PER_PAGE', 500), config.get('PAGINATION_MAX_PER_PAGE', 500)))
+    until = (now or datetime.utcnow()) - timedelta(seconds=config.get('SYNC_SETTLE_SECONDS', 5))
+    position = None
+    if cursor:
+        position = decode_cursor(cursor, _CURSOR_COLUMNS)
+        if position is None:
+            raise ValueError('Malformed cursor.')
+
+    key = _key(model)
+    live = db.session.execute(
+        select(*dict.fromkeys((model.updatedAt, key, *columns)))
+        .where(*_window(model.updatedAt, key, 0, position, since, until, nullable=True))
+        .order_by(model.updatedAt, key)
+        .limit(per_page + 1)
+    ).all()
+    dead = db.session.execute(
+        select(Tombstone.deletedAt, Tombstone.ref)
+        .where(Tombstone.entity == model.__tablename__,
+               *_window(Tombstone.deletedAt, Tombstone.ref, 1, position, since, until))
+        .order_by(Tombstone.deletedAt, Tombstone.ref)
+        .limit(per_page + 1)
+    ).all()
+
+    # Each side holds its own first per_page + 1 entries, so the merge does too
+    entries = sorted(
+        [(row.updatedAt or EPOCH, 0, getattr(row, key.key), row) for row in live]
+        + [(row.deletedAt, 1, row.ref, None) for row in dead],
+        key=lambda entry: entry[:3],
+    )
+    has_more = len(entries) > per_page
+    entries = entries[:per_page]
+    if entries:
+        cursor = encode_cursor(entries[-1][:3])
+    return ChangePage(entries, cursor, has_more, until)
+
+
+# Tombstones -----------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _cascades(table):
+    """(child table, foreign key) for every table the database deletes from along with ``table``."""
+    return tuple(
+        (child, fk)
+        for child in db.metadata.sorted_tables
+        for fk in child.foreign_key_constraints
+        if fk.referred_table is table and (fk.ondelete or '').upper() == 'CASCADE'
+    )
+
+
+@lru_cache(maxsize=None)
+def _reaches_synced(table):
+    return table.name in SYNCED or any(_reaches_synced(child) for child, _ in _cascades(table))
+
+
+def _doomed(connection, table, rows, found):
+    # Add the synced rows deleted along with ``rows`` of ``table`` to ``found``
+    if table.name in SYNCED:
+        key = _key(SYNCED[table.name]).key
+        found[table.name].update(row[key] for row in rows)
+    for child, fk in _cascades(table):
+        if not _reaches_synced(child):
+            continue
+        element = fk.elements[0]  # every foreign key in this schema is a single column
+        values = {row[element.column.name] for row in rows} - {None}
+        if not values:
+            continue
+        needed = dict.fromkeys([*child.primary_key.columns, *(f.elements[0].column for _, f in _cascades(child))])
+        children = [row._mapping for row in connection.execute(select(*needed).where(element.parent.in_(values)))]
+        if children:
+            _doomed(connection, child, children, found)
+
+
+def _before_flush(session, flush_context, instances):
+    found = defaultdict(set)
+    for obj in session.deleted:
+        mapper = inspect(obj).mapper
+        if _reaches_synced(mapper.local_table):
+            row = {attr.columns[0].name: getattr(obj, attr.key) for attr in mapper.column_attrs}
+            _doomed(session.connection(), mapper.local_table, [row], found)
+    if found:
+        now = datetime.utcnow()
+        session.connection().execute(insert(Tombstone.__table__), [
+            {'entity': entity, 'ref': ref, 'deletedAt': now}
+            for entity, refs in found.items() for ref in refs
+        ])
+
+
+def init_app(app):
+    if not event.contains(RoutingSession, 'before_flush', _before_flush):
+        event.listen(RoutingSession, 'before_flush', _before_flush)
+
+
+sync_cli = AppGroup('sync', help='Change feed maintenance.')
+
+
+@sync_cli.command('prune')
+@click.option('--days', type=int, default=None, help='Delete tombstones older than this (default SYNC_TOMBSTONE_DAYS).')
+def prune_command(days):
+    """Delete old tombstones; a consumer further behind than this must re-pull in full."""
+    days = days if days is not None else current_app.config.get('SYNC_TOMBSTONE_DAYS', 90)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = Tombstone.query.filter(Tombstone.deletedAt < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'Deleted {deleted} tombstones.')
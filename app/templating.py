@@ -0,0 +1,91 @@
+import os
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache
+
+# Compiled templates are shared through TEMPLATE_BYTECODE_CACHE, so a new
+# worker loads bytecode instead of parsing and compiling every template on its
+# first requests. Jinja keys each entry by template name and a checksum of the
+# source, so an edited template is recompiled rather than served stale.
+
+
+def _bytecode_cache(backend):
+    if not backend:
+        return None
+    if backend.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('TEMPLATE_BYTECODE_CACHE points at Redis but the redis package is not installed.') from e
+        # redis.set(key, value) matches the memcached client interface Jinja expects
+        return MemcachedBytecodeCache(redis.Redis.from_url(backend), prefix='ums:jinja:')
+    directory = os.path.abspath(backend)
+    os.makedirs(directory, exist_ok=True)
+    # Jinja writes each file under a temporary name and renames it, so workers can share the directory
+    return FileSystemBytecodeCache(directory, pattern='ums-%s.cache')
+
+
+def template_names(app):
+    """Every HTML template of the app and its blueprints."""
+    return sorted(name for name in app.jinja_env.list_templates() if name.endswith('.html'))
+
+
+def _compile_all(environment, names):
+    started = time.perf_counter()
+    for name in names:
+        environment.get_template(name)
+    return time.perf_counter() - started
+
+
+def warm_up(app):
+    """Compile every template into the app's environment; returns (templates, seconds)."""
+    names = template_names(app)
+    return len(names), _compile_all(app.jinja_env, names)
+
+
+def measure(app):
+    """(templates, seconds compiling from source, seconds loading from the bytecode cache or None).
+
+    Each figure is taken on a fresh environment, as a newly started worker has.
+    """
+    names = template_names(app)
+    cache = app.jinja_env.bytecode_cache
+    from_source = _compile_all(app.create_jinja_environment(), names)
+    if cache is None:
+        return len(names), from_source, None
+
+    def cached_environment():
+        environment = app.create_jinja_environment()
+        environment.bytecode_cache = cache
+        return environment
+
+    _compile_all(cached_environment(), names)  # fills the cache
+    return len(names), from_source, _compile_all(cached_environment(), names)
+
+
+def init_app(app):
+    # Called after the blueprints are registered so their template folders are visible
+    app.jinja_env.bytecode_cache = _bytecode_cache(app.config.get('TEMPLATE_BYTECODE_CACHE'))
+    if app.config.get('TEMPLATE_WARMUP'):
+        count, seconds = warm_up(app)
+        app.logger.info('Compiled %d templates in %.1f ms', count, seconds * 1000)
+
+
+templates_cli = AppGroup('templates', help='Template compilation.')
+
+
+@templates_cli.command('warm')
+def warm_command():
+    """Fill the bytecode cache with every template and report the cold-start time saved.
+
+    Run at deploy time, before workers restart, so none of them compiles a template.
+    """
+    count, from_source, cached = measure(current_app)
+    click.echo(f'{count} templates compile from source in {from_source * 1000:.1f} ms.')
+    if cached is None:
+        click.echo('No TEMPLATE_BYTECODE_CACHE is configured; every worker compiles them again.')
+        return
+    click.echo(f'From the bytecode cache they load in {cached * 1000:.1f} ms, '
+               f'saving {(from_source - cached) * 1000:.1f} ms per cold worker.')
@@ -0,0 +1,34 @@
+from app import db
+
+
+def _insert(table):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f'Upserts are not supported on {dialect}')
+    return dialect, insert(table)
+
+
+def upsert(table, key, update, rows=None, select=None, columns=None):
+    """Build an INSERT that updates the existing row when ``key`` already exists.
+
+    Insert either ``rows`` (a list of dicts, sent as one multi-row VALUES) or the
+    result of ``select`` into ``columns``. ``update`` is a list of column names to
+    overwrite with the incoming values, or a function that receives the incoming
+    row's columns and returns a {column: expression} dict. Compiles to
+    ON DUPLICATE KEY UPDATE on MySQL and ON CONFLICT DO UPDATE on SQLite/PostgreSQL.
+    """
+    dialect, stmt = _insert(table)
+    stmt = stmt.values(rows) if select is None else stmt.from_select(list(columns), select)
+
+    incoming = stmt.inserted if dialect == 'mysql' else stmt.excluded
+    set_ = update(incoming) if callable(update) else {c: incoming[c] for c in update}
+
+    if dialect == 'mysql':
+        return stmt.on_duplicate_key_update(set_)
+    return stmt.on_conflict_do_update(index_elements=list(key), set_=set_)
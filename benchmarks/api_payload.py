@@ -0,0 +1,68 @@
+"""Bytes and latency of one page of people: admin HTML versus the JSON API.
+
+Builds a synthetic university on a throwaway SQLite database, logs in as an
+admin and fetches the same page of --per-page rows as the admin students
+table, the full JSON resource, a sparse ?fields= selection, each of those
+gzip encoded, and a revalidation with If-None-Match. Reports the bytes on
+the wire and the median latency of each. Run from the repository root:
+
+    python -m benchmarks.api_payload --scale 1 --per-page 200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import datagen
+
+SPARSE_FIELDS = 'person_id,name,email'
+
+
+def measure(client, url, headers, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append(time.perf_counter() - started)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f'{url} returned {response.status_code}')
+    return response, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--per-page', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from app import create_app
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(datagen.make_config(f"sqlite:///{os.path.join(tmp, 'api.db')}"))
+        population, elapsed = datagen.build(app, datagen.Scale(args.scale, exams_per_course=0, classes_per_course=0),
+                                            args.seed)
+        print(f'{sum(population.counts.values())} rows generated in {elapsed:.1f}s')
+
+        client = app.test_client()
+        client.post('/login', data={'email': population.admins[0], 'password': datagen.PASSWORD})
+        api = f'/api/v1/people?role=Student&per_page={args.per_page}'
+        identity = {'Accept-Encoding': 'identity'}
+        gzipped = {'Accept-Encoding': 'gzip'}
+        etag = client.get(api, headers=gzipped).headers['ETag']
+
+        for name, url, headers in (
+            ('admin HTML', f'/admin/students?per_page={args.per_page}', identity),
+            ('API, every field', api, identity),
+            ('API, every field, gzip', api, gzipped),
+            (f'API, fields={SPARSE_FIELDS}', f'{api}&fields={SPARSE_FIELDS}', identity),
+            ('API, sparse, gzip', f'{api}&fields={SPARSE_FIELDS}', gzipped),
+            ('API, If-None-Match', api, dict(gzipped, **{'If-None-Match': etag})),
+        ):
+            response, median = measure(client, url, headers, args.repeat)
+            print(f'{name:>40}: {response.status_code} {len(response.data):>9,} bytes  p50={median * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+"""Deterministic synthetic university for benchmarks and load tests.
+
+Fills an empty database with departments, courses, people and a term's worth
+of enrollments, fees, exams, submissions, grades and attendance, touching
+every model in app.models. Submission files are written to the configured
+store (in memory unless --storage-root is given). The same scale factor and
+seed always produce the same rows. Scale 1 is about 1,000 students and 100,000 attendance marks;
+attendance grows linearly, so --scale 20 writes about two million. The schema
+is brought up with the migrations first. Run from the repository root:
+
+    python -m benchmarks.datagen --scale 20 --database-url mysql+mysqlconnector://...
+"""
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from config import Config
+
+# Every generated account has this password
+PASSWORD = 'benchmark'
+TERM_START = datetime(2024, 9, 2, 9, 0)
+SEMESTER = 'Fall'
+COURSES_PER_STUDENT = 4
+BATCH_SIZE = 5000
+FIRST_NAMES = ('Aiko', 'Amara', 'Ben', 'Carlos', 'Chen', 'Dmitri', 'Elena', 'Fatima', 'Grace', 'Hiro', 'Ines',
+               'Jamal', 'Kofi', 'Lena', 'Mateo', 'Mei', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami',
+               'Tariq', 'Uma', 'Viktor', 'Wen', 'Yara', 'Zane')
+LAST_NAMES = ('Abebe', 'Berg', 'Costa', 'Dubois', 'Eze', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen', 'Kim',
+              'Lopez', 'Moreau', 'Nakamura', 'Okafor', 'Patel', 'Quispe', 'Rossi', 'Silva', 'Tanaka', 'Umar',
+              'Varga', 'Wang', 'Xu', 'Yilmaz', 'Zhou')
+
+
+class Scale:
+    """Row counts for one scale factor. Explicit counts override the derived ones."""
+
+    def __init__(self, factor=1.0, students=None, courses=None, exams_per_course=4, classes_per_course=30):
+        self.factor = factor
+        self.students = students if students is not None else max(50, int(1000 * factor))
+        # About 100 students per course section
+        self.courses = courses if courses is not None else max(COURSES_PER_STUDENT, self.students * COURSES_PER_STUDENT // 100)
+        self.departments = max(2, min(50, self.courses // 10))
+        self.professors = max(self.departments, self.courses // 2)
+        self.admins = max(1, self.students // 5000)
+        # People who have registered but not enrolled yet; the enroll journeys use them
+        self.users = max(20, self.students // 10)
+        self.exams_per_course = exams_per_course
+        self.classes_per_course = classes_per_course
+
+
+class Population:
+    """What was generated, for journeys that need real IDs and logins."""
+
+    def __init__(self):
+        self.admins = []  # emails
+        self.users = []  # emails
+        self.students = []  # (email, studID, active courseIDs)
+        self.professors = []  # (email, profID, courseIDs in their department)
+        self.rosters = {}  # courseID -> active studIDs
+        self.assignments = {}  # courseID -> Assignment examIDs
+        self.submissions = {}  # examID -> submissionIDs
+        self.counts = {}  # table name -> rows written
+
+
+class _BulkWriter:
+    """Buffers rows per model and writes them with executemany INSERTs.
+
+    Models are flushed in the order they are listed, parents first, so foreign
+    keys hold at every flush even on databases that check them immediately.
+    """
+
+    def __init__(self, connection, models, counts):
+        self.connection = connection
+        self.models = models
+        self.pending = {model: [] for model in models}
+        self.counts = counts
+
+    def add(self, model, row):
+        rows = self.pending[model]
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            self.flush(upto=model)
+
+    def flush(self, upto=None):
+        from sqlalchemy import insert
+        for model in self.models:
+            rows = self.pending[model]
+            if rows:
+                self.connection.execute(insert(model), rows)
+                self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+                self.pending[model] = []
+            if model is upto:
+                break
+
+
+def generate(connection, scale, password_hash, seed=1):
+    """Write the synthetic university through ``connection`` and return its Population.
+
+    Primary keys that other rows refer to are assigned here rather than by
+    the database, so the database must be empty. The caller owns the transaction.
+    """
+    from sqlalchemy import delete
+    from app.attendance import UNIVERSITY
+    from app.grading import GRADE_CATEGORIES
+    from app.search import rebuild as rebuild_search
+    from app.models import (Address, Admin, Attendance, AttendanceSummary, AttendanceTotals, Course, Department,
+                            Enrollment, Exam, Fee, Grade, IdempotencyKey, Person, Professor, Student, Submission)
+    from app.storage import get_store
+
+    rng = random.Random(seed)
+    population = Population()
+    writer = _BulkWriter(connection, [
+        Department, Person, Address, Admin, Professor, Student, Course, Enrollment, Fee,
+        Exam, Submission, Grade, Attendance, AttendanceSummary, AttendanceTotals, IdempotencyKey,
+    ], population.counts)
+    class_days = [TERM_START + timedelta(days=2 * day) for day in range(scale.classes_per_course)]
+    stamp = {'createdAt': TERM_START, 'updatedAt': TERM_START}
+
+    departments = [f'D{d:03d}' for d in range(scale.departments)]
+    for d, departmentID in enumerate(departments):
+        writer.add(Department, dict(stamp, departmentID=departmentID, name=f'Department of Subject {d}',
+                                    location=f'Building {d % 7}', contactInfo=f'dept{d}@example.edu'))
+
+    person_ids = iter(range(1, 10 ** 9))
+    submission_ids = iter(range(1, 10 ** 9))
+    # Every submission gets a small stored file, so downloads and ZIPs of generated data work
+    store = get_store()
+
+    def person(role, email):
+        person_id = next(person_ids)
+        writer.add(Person, dict(
+            stamp, person_id=person_id, name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', role=role, email=email, password=password_hash,
+            age=rng.randint(18, 70), gender=rng.choice(('Male', 'Female', 'Other', 'Prefer not to say')),
+            phone_no=f'+1555{person_id:07d}',
+        ))
+        writer.add(Address, dict(
+            stamp, addressID=person_id, person_id=person_id, street=f'{rng.randint(1, 999)} College Road',
+            city=f'City {person_id % 97}', state='State', postal_code=f'{rng.randint(10000, 99999)}', country='Country',
+        ))
+        return person_id
+
+    for a in range(scale.admins):
+        email = f'admin{a}@bench.example.edu'
+        writer.add(Admin, dict(stamp, person_id=person('Admin', email),
+                               adminID=f'A{a:04d}', role='Registrar', stu_start_date=TERM_START.date()))
+        population.admins.append(email)
+
+    teaching = {departmentID: [] for departmentID in departments}
+    for p in range(scale.professors):
+        email, profID, departmentID = f'prof{p}@bench.example.edu', f'P{p:05d}', departments[p % scale.departments]
+        writer.add(Professor, dict(stamp, person_id=person('Professor', email),
+                                   profID=profID, department_id=departmentID))
+        teaching[departmentID].append(profID)
+        population.professors.append((email, profID, []))
+
+    studIDs = []
+    for s in range(scale.students):
+        studID = f'S{s:07d}'
+        writer.add(Student, dict(stamp, person_id=person('Student', f'student{s}@bench.example.edu'),
+                                 studID=studID))
+        studIDs.append(studID)
+
+    for u in range(scale.users):
+        email = f'user{u}@bench.example.edu'
+        person('User', email)
+        population.users.append(email)
+
+    # Each student takes COURSES_PER_STUDENT courses; most enrollments are paid and active
+    courseIDs = [f'C{c:05d}' for c in range(scale.courses)]
+    rosters = {courseID: [] for courseID in courseIDs}
+    enrollments = []
+    for s, studID in enumerate(studIDs):
+        active = []
+        for c in sorted(rng.sample(range(scale.courses), COURSES_PER_STUDENT)):
+            status = rng.choices(('Active', 'Dropped', 'Pending Payment'), weights=(85, 8, 7))[0]
+            enrollments.append((studID, courseIDs[c], status))
+            rosters[courseIDs[c]].append((studID, status))
+            if status == 'Active':
+                active.append(courseIDs[c])
+        population.students.append((f'student{s}@bench.example.edu', studID, active))
+
+    course_fees = {}
+    for c, courseID in enumerate(courseIDs):
+        holding = sum(status != 'Dropped' for _, status in rosters[courseID])
+        course_fees[courseID] = rng.choice((100, 250, 500, 1200))
+        writer.add(Course, dict(
+            stamp, courseID=courseID, courseName=f'Course {c}', departmentID=departments[c % scale.departments],
+            duration='1 semester', description=f'Synthetic course {c} for benchmarks.',
+            courseFee=course_fees[courseID], capacity=holding + max(10, holding // 4), seatsTaken=holding,
+        ))
+
+    fees = 0
+    for enrollmentID, (studID, courseID, status) in enumerate(enrollments, start=1):
+        paid = status != 'Pending Payment'
+        writer.add(Enrollment, dict(
+            stamp, enrollmentID=enrollmentID, studID=studID, courseID=courseID, status=status, semester=SEMESTER,
+            enrollmentDate=TERM_START - timedelta(days=rng.randint(7, 60)), paymentStatus=paid,
+            dropDate=TERM_START + timedelta(days=rng.randint(1, 20)) if status == 'Dropped' else None,
+        ))
+        if paid:
+            fees += 1
+            writer.add(Fee, dict(stamp, feeID=fees, enrollmentID=enrollmentID, amount=course_fees[courseID], dueDate=TERM_START,
+                                 paymentMethod=rng.choice(('Credit Card', 'Bank Transfer', 'Cash', 'Other'))))
+            # Completed payment forms, as app.idempotency leaves them until purged
+            writer.add(IdempotencyKey, {
+                'key': hashlib.sha256(f'{seed}:{enrollmentID}'.encode()).hexdigest()[:32],
+                'person_id': None, 'endpoint': 'main.payment', 'location': '/login', 'createdAt': TERM_START,
+            })
+
+    # Exams alternate Written/Assignment; the first half of the term's exams are graded
+    examID = 0
+    total_classes = attended_classes = 0
+    for c, courseID in enumerate(courseIDs):
+        active = [studID for studID, status in rosters[courseID] if status == 'Active']
+        population.rosters[courseID] = active
+        population.assignments[courseID] = []
+        for x in range(scale.exams_per_course):
+            examID += 1
+            examType = 'Assignment' if x % 2 else 'Written'
+            writer.add(Exam, dict(stamp, examID=examID, courseID=courseID, location=f'Hall {x % 5}',
+                                  date=TERM_START + timedelta(days=14 * (x + 1)), examType=examType,
+                                  duration=120 if examType == 'Written' else 0, maxMarks=100))
+            if examType == 'Assignment':
+                population.assignments[courseID].append(examID)
+                population.submissions[examID] = []
+            for studID in active:
+                if examType == 'Assignment' and rng.random() < 0.9:
+                    submissionID = next(submission_ids)
+                    content = f'%PDF-1.4\n% Answers of {studID} for exam {examID}\n'.encode()
+                    writer.add(Submission, {
+                        'submissionID': submissionID, 'examID': examID, 'studID': studID,
+                        'submittedat': TERM_START + timedelta(days=14 * (x + 1)),
+                        'filepath': store.save(BytesIO(content), 'answers.pdf'),
+                    })
+                    population.submissions[examID].append(submissionID)
+                if x < (scale.exams_per_course + 1) // 2:
+                    writer.add(Grade, dict(stamp, courseID=courseID, studID=studID, examID=examID,
+                                           grade=round(min(100.0, max(0.0, rng.gauss(68, 15))), 1),
+                                           gradeCategory=GRADE_CATEGORIES[examType]))
+
+        # One mark per active student per class; summaries match what app.attendance would compute
+        profs = teaching[departments[c % scale.departments]]
+        profID = profs[(c // scale.departments) % len(profs)]
+        for studID in active:
+            attended = 0
+            for day in class_days:
+                present = rng.random() < 0.88
+                attended += present
+                writer.add(Attendance, {'studID': studID, 'profID': profID, 'courseID': courseID, 'date': day,
+                                        'status': present, 'createdAt': day, 'updatedAt': day})
+            if class_days:
+                writer.add(AttendanceSummary, {
+                    'studID': studID, 'courseID': courseID, 'totalClasses': len(class_days),
+                    'attendedClasses': attended, 'lastDate': class_days[-1], 'updatedAt': class_days[-1],
+                })
+                total_classes += len(class_days)
+                attended_classes += attended
+
+    for email, profID, courses in population.professors:
+        departmentID = departments[int(profID[1:]) % scale.departments]
+        courses.extend(courseIDs[c] for c in range(scale.courses) if departments[c % scale.departments] == departmentID)
+
+    # The migrations start the university totals from empty summaries; replace that row
+    connection.execute(delete(AttendanceTotals))
+    writer.add(AttendanceTotals, {'totalsID': UNIVERSITY, 'totalClasses': total_classes,
+                                  'attendedClasses': attended_classes, 'updatedAt': TERM_START})
+
+    writer.flush()
+    population.counts['SearchDocument'] = rebuild_search(connection)
+    return population
+
+
+def make_config(database_url, storage_root=None):
+    """Benchmark settings; submission files go under ``storage_root``, or stay in memory when None."""
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        BCRYPT_LOG_ROUNDS = 4
+        METRICS_ENABLED = False
+        SUBMISSION_STORAGE_BACKEND = 'local' if storage_root else 'memory'
+        SUBMISSION_STORAGE_ROOT = storage_root
+    return BenchConfig
+
+
+def build(app, scale, seed=1):
+    """Migrate the app's database and fill it; returns (Population, seconds taken)."""
+    from app import db
+    from app.migrations import upgrade
+    from app.passwords import get_hasher
+    with app.app_context():
+        upgrade(db.engine, echo=lambda message: None)
+        started = time.perf_counter()
+        password_hash = get_hasher().hash(PASSWORD)
+        with db.engine.begin() as connection:
+            population = generate(connection, scale, password_hash, seed)
+        return population, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', default=None, help='an empty database; default: a temporary SQLite file')
+    parser.add_argument('--storage-root', default=None,
+                        help='directory for the submission files; default: in memory, gone when this exits')
+    args = parser.parse_args()
+
+    from app import create_app
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'university.db')}"
+        population, elapsed = build(create_app(make_config(url, args.storage_root)), Scale(args.scale), args.seed)
+        total = sum(population.counts.values())
+        print(f'{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)')
+        for table_name, count in sorted(population.counts.items()):
+            print(f'{table_name:>20}: {count}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Registration-day load test for enroll and pay.
+
+Many users enroll in one course with fewer seats than users at the same time.
+Every user double-submits the enroll form (same idempotency key) and then pays
+twice. Afterwards the database is checked for overbooking, duplicate
+enrollments and duplicate fees, and POST latency percentiles are reported.
+Runs against a throwaway SQLite database unless --database-url is given (the
+schema is created there, so point it at an empty database). SQLite takes one
+writer at a time, so its tail latency mostly measures lock waits; use MySQL
+for p99 numbers that mean anything. Run from the repository root:
+
+    python -m benchmarks.enrollment_load --users 400 --capacity 150 --threads 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+
+def make_config(database_url, threads):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': threads, 'max_overflow': threads}
+        METRICS_ENABLED = False
+        CACHE_TTL = None
+    if database_url.startswith('sqlite'):
+        # SQLite serialises writers; wait for the lock instead of failing
+        BenchConfig.SQLALCHEMY_ENGINE_OPTIONS = dict(BenchConfig.SQLALCHEMY_ENGINE_OPTIONS, connect_args={'timeout': 60})
+    return BenchConfig
+
+
+def seed(app, users, capacity):
+    from app import db
+    from app.models import Course, Department, Person
+    with app.app_context():
+        db.create_all()
+        db.session.add(Department(departmentID='BENCH', name='Benchmark'))
+        db.session.add(Course(courseID='BENCH101', courseName='Load Testing', departmentID='BENCH',
+                              courseFee=100, capacity=capacity, description='Benchmark course'))
+        db.session.bulk_insert_mappings(Person, [
+            {'name': f'User {i}', 'email': f'enroller{i}@example.com', 'role': 'User', 'password': 'x'}
+            for i in range(users)
+        ])
+        db.session.commit()
+        return [person_id for (person_id,) in db.session.query(Person.person_id).order_by(Person.person_id)]
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+def run(app, person_ids, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def timed_post(client, url, data):
+        started = time.perf_counter()
+        response = client.post(url, data=data)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+        return response
+
+    def logged_in(person_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = person_id
+            session['user_role'] = 'User'
+        return client
+
+    def enroller(person_id):
+        client = logged_in(person_id)
+        client.get('/enroll/BENCH101')  # creates the Student row, as a real visit would
+
+        # Double-click: the same form submitted twice at once from the same user
+        key = uuid.uuid4().hex
+        with ThreadPoolExecutor(max_workers=2) as clicks:
+            responses = list(clicks.map(
+                lambda c: timed_post(c, '/enroll/BENCH101', {'semester': 'Fall', 'idempotency_key': key}),
+                [client, logged_in(person_id)],
+            ))
+        locations = [r.headers.get('Location', '') for r in responses]
+        target = next((location for location in locations if '/payment/' in location), None)
+        if target is None:
+            return 'full'
+
+        key = uuid.uuid4().hex
+        for _ in range(2):
+            timed_post(client, target, {'paymentMethod': 'Cash', 'idempotency_key': key})
+        return 'enrolled'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(enroller, person_ids))
+    return outcomes, sorted(latencies), time.perf_counter() - started
+
+
+def check(app, capacity):
+    from sqlalchemy import func
+    from app import db
+    from app.models import Course, Enrollment, Fee
+    with app.app_context():
+        course = db.session.get(Course, 'BENCH101')
+        enrollments = Enrollment.query.filter_by(courseID='BENCH101').count()
+        holding = Enrollment.query.filter(Enrollment.courseID == 'BENCH101', Enrollment.status != 'Dropped').count()
+        duplicates = db.session.query(Enrollment.studID).filter_by(courseID='BENCH101') \
+            .group_by(Enrollment.studID, Enrollment.semester).having(func.count() > 1).count()
+        double_fees = db.session.query(Fee.enrollmentID).group_by(Fee.enrollmentID).having(func.count() > 1).count()
+        return {
+            'capacity': capacity,
+            'seatsTaken': course.seatsTaken,
+            'enrollments': enrollments,
+            'holding a seat': holding,
+            'overbooked': max(0, holding - capacity),
+            'duplicate enrollments': duplicates,
+            'enrollments paid twice': double_fees,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=400)
+    parser.add_argument('--capacity', type=int, default=150)
+    parser.add_argument('--threads', type=int, default=200)
+    parser.add_argument('--database-url', default=None, help='default: a temporary SQLite file')
+    args = parser.parse_args()
+
+    from app import create_app
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = create_app(make_config(url, args.threads))
+        person_ids = seed(app, args.users, args.capacity)
+
+        outcomes, latencies, elapsed = run(app, person_ids, args.threads)
+        print(f'{args.users} users, {args.threads} threads, {len(latencies)} POSTs in {elapsed:.2f}s')
+        print(f"enrolled {outcomes.count('enrolled')}, turned away {outcomes.count('full')}")
+        print('latency ms: ' + ' '.join(
+            f'p{q}={percentile(latencies, q) * 1000:.1f}' for q in (50, 90, 99)
+        ) + f' max={latencies[-1] * 1000:.1f}')
+        for name, value in check(app, args.capacity).items():
+            print(f'{name:>24}: {value}')
+
+
+if __name__ == '__main__':
+    main()
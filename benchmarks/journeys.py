@@ -0,0 +1,268 @@
+"""Scripted user journeys with latency and throughput per route.
+
+Builds a synthetic university with benchmarks.datagen, then runs a weighted
+mix of journeys from many threads through the app factory's test client:
+students browsing their courses, applicants enrolling and paying, professors
+marking attendance, students submitting assignments that their professor
+then downloads, singly and as a ZIP, and admins paging through lists. Every journey starts with POST /login. Each request is timed and
+grouped by method and URL rule, and p50/p95/p99 latency and requests per
+second are reported per route. bcrypt runs at cost 4 so logins do not drown
+out everything else (benchmarks.login_throughput measures hashing). Runs
+against a throwaway SQLite database unless --database-url points at an empty
+one; as with enrollment_load, SQLite write latency is mostly lock waits.
+Run from the repository root:
+
+    python -m benchmarks.journeys --scale 1 --journeys 2000 --threads 16
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from benchmarks import datagen
+from benchmarks.enrollment_load import percentile
+
+PERCENTILES = (50, 95, 99)
+
+
+def make_config(database_url, threads):
+    class JourneyConfig(datagen.make_config(database_url)):
+        DB_POOL_SIZE = threads
+        DB_MAX_OVERFLOW = threads
+        BCRYPT_WAIT_TIMEOUT = None
+    if database_url.startswith('sqlite'):
+        # SQLite serialises writers; wait for the lock instead of failing
+        JourneyConfig.SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 60}}
+    return JourneyConfig
+
+
+class Recorder:
+    """Collects (route, seconds, ok) for every request made by any thread."""
+
+    def __init__(self, app):
+        self.adapter = app.url_map.bind('localhost')
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def route(self, method, path):
+        from werkzeug.exceptions import HTTPException
+        try:
+            rule, _ = self.adapter.match(path.partition('?')[0], method=method, return_rule=True)
+        except HTTPException:
+            return f'{method} <no route>'
+        return f'{method} {rule.rule}'
+
+    def record(self, route, seconds, ok):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+class Browser:
+    """One user's session: a test client whose requests are timed by route."""
+
+    def __init__(self, app, recorder):
+        self.client = app.test_client()
+        self.recorder = recorder
+
+    def request(self, method, path, expect=(200, 302), **kwargs):
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, **kwargs)
+        response.get_data()  # streamed bodies are produced while being read; time them too
+        elapsed = time.perf_counter() - started
+        self.recorder.record(self.recorder.route(method, path), elapsed, response.status_code in expect)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def login(self, email):
+        response = self.post('/login', data={'email': email, 'password': datagen.PASSWORD})
+        if '/login' in response.headers.get('Location', '/login'):
+            raise RuntimeError(f'login failed for {email}')
+
+
+class Cast:
+    """The generated population, handed out to journeys."""
+
+    def __init__(self, population, scale):
+        self.population = population
+        self.lock = threading.Lock()
+        self.applicants = iter(population.users)
+        self.professor_of = {}
+        for email, _, courses in population.professors:
+            for courseID in courses:
+                self.professor_of.setdefault(courseID, email)
+        # Attendance is marked on days after the generated term so every POST writes new rows
+        self.next_class_day = itertools.count(2 * scale.classes_per_course)
+
+    def applicant(self):
+        with self.lock:
+            return next(self.applicants, None)
+
+    def class_day(self):
+        with self.lock:
+            return datagen.TERM_START + timedelta(days=next(self.next_class_day))
+
+
+def student_browse(browser, cast, rng):
+    email, studID, courses = rng.choice(cast.population.students)
+    browser.login(email)
+    browser.get('/student/dashboard')
+    browser.get('/student/enrolled_courses')
+    for courseID in rng.sample(courses, min(2, len(courses))):
+        browser.get(f'/student/courses/{courseID}/exams')
+        browser.get(f'/student/courses/{courseID}/attendance')
+        browser.get(f'/student/courses/{courseID}/grades')
+
+
+def submit_assignment(browser, cast, rng):
+    email, studID, courses = rng.choice(cast.population.students)
+    courses = [courseID for courseID in courses if cast.population.assignments[courseID]]
+    if not courses:
+        return
+    courseID = rng.choice(courses)
+    examID = rng.choice(cast.population.assignments[courseID])
+    browser.login(email)
+    browser.get(f'/student/courses/{courseID}/exams')
+    browser.get(f'/student/exams/{examID}/submit')
+    content = f'{studID} {examID} {rng.random()}\n'.encode() * 256
+    browser.post(f'/student/exams/{examID}/submit', data={'file': (BytesIO(content), 'answers.pdf')},
+                 content_type='multipart/form-data')
+
+    # The course's professor collects the submissions
+    browser.get('/logout')
+    browser.login(cast.professor_of[courseID])
+    browser.get(f'/professor/exams/{examID}/submissions')
+    submissions = cast.population.submissions[examID]
+    if submissions:
+        browser.get(f'/professor/submissions/{rng.choice(submissions)}/download')
+    browser.get(f'/professor/exams/{examID}/submissions.zip')
+
+
+def enroll_and_pay(browser, cast, rng):
+    email = cast.applicant()
+    if email is None:
+        return  # every applicant has enrolled already
+    courseID = rng.choice(list(cast.population.rosters))
+    browser.login(email)
+    browser.get('/courses')
+    browser.get(f'/enroll/{courseID}')
+    response = browser.post(f'/enroll/{courseID}', data={'semester': datagen.SEMESTER, 'idempotency_key': uuid.uuid4().hex})
+    payment = response.headers.get('Location', '')
+    if '/payment/' not in payment:
+        return  # course full
+    browser.get(payment)
+    browser.post(payment, data={'paymentMethod': 'Credit Card', 'idempotency_key': uuid.uuid4().hex})
+
+
+def mark_attendance(browser, cast, rng):
+    email, profID, courses = rng.choice(cast.population.professors)
+    if not courses:
+        return
+    courseID = rng.choice(courses)
+    roster = cast.population.rosters[courseID]
+    browser.login(email)
+    browser.get('/professor/courses')
+    browser.get(f'/professor/courses/{courseID}/attendance')
+    present = [studID for studID in roster if rng.random() < 0.9]
+    browser.post(f'/professor/courses/{courseID}/attendance',
+                 data={'date': cast.class_day().strftime('%Y-%m-%d'), 'present': present})
+
+
+def admin_lists(browser, cast, rng):
+    browser.login(rng.choice(cast.population.admins))
+    browser.get('/admin/dashboard')
+    for path in ('/admin/students', '/admin/courses', '/admin/enrollments', '/admin/payments'):
+        browser.get(path)
+
+
+# (journey, weight in the mix)
+JOURNEYS = (
+    (student_browse, 45),
+    (submit_assignment, 15),
+    (enroll_and_pay, 15),
+    (mark_attendance, 15),
+    (admin_lists, 10),
+)
+
+
+def run(app, cast, count, threads, seed=1, only=None):
+    """Run ``count`` journeys; returns (Recorder, {journey: (runs, failures)}, seconds)."""
+    journeys = [(journey, weight) for journey, weight in JOURNEYS if not only or journey.__name__ in only]
+    schedule = random.Random(seed).choices(
+        [journey for journey, _ in journeys], weights=[weight for _, weight in journeys], k=count
+    )
+    recorder = Recorder(app)
+    outcomes = defaultdict(lambda: [0, 0])
+    lock = threading.Lock()
+
+    def play(index):
+        journey = schedule[index]
+        try:
+            journey(Browser(app, recorder), cast, random.Random(seed * 1000003 + index))
+            failed = False
+        except Exception:
+            failed = True
+        with lock:
+            outcomes[journey.__name__][0] += 1
+            outcomes[journey.__name__][1] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(play, range(count)))
+    return recorder, dict(outcomes), time.perf_counter() - started
+
+
+def report(recorder, outcomes, elapsed):
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    print(f'{sum(runs for runs, _ in outcomes.values())} journeys, {total} requests in {elapsed:.2f}s '
+          f'({total / elapsed:.1f} req/s)')
+    for name, (runs, failures) in sorted(outcomes.items()):
+        print(f'  {name:<18} {runs:>6} runs {failures:>4} failed')
+    print()
+    print(f"{'route':<56}{'count':>7}{'errors':>7}" + ''.join(f"{f'p{q} ms':>9}" for q in PERCENTILES) + f"{'req/s':>9}")
+    for route, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        print(f'{route:<56}{len(latencies):>7}{recorder.errors[route]:>7}'
+              + ''.join(f'{percentile(latencies, q) * 1000:>9.1f}' for q in PERCENTILES)
+              + f'{len(latencies) / elapsed:>9.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--journeys', type=int, default=1000, help='journeys to run in total')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='*', choices=[journey.__name__ for journey, _ in JOURNEYS],
+                        help='run only these journeys')
+    parser.add_argument('--database-url', default=None, help='an empty database; default: a temporary SQLite file')
+    args = parser.parse_args()
+
+    from app import create_app
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'journeys.db')}"
+        app = create_app(make_config(url, args.threads))
+        scale = datagen.Scale(args.scale)
+        population, seconds = datagen.build(app, scale, args.seed)
+        print(f'{sum(population.counts.values())} rows generated in {seconds:.1f}s '
+              f"({population.counts.get('Attendance', 0)} attendance marks)")
+        report(*run(app, Cast(population, scale), args.journeys, args.threads, args.seed, args.only))
+
+
+if __name__ == '__main__':
+    main()
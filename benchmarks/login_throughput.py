@@ -0,0 +1,83 @@
+"""Login throughput under concurrent load.
+
+Runs POST /login from many threads against a throwaway SQLite database and
+reports logins per second for the bounded bcrypt pool at a few concurrency
+levels. Run from the repository root:
+
+    python -m benchmarks.login_throughput --users 50 --threads 1 8 32
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+
+def make_config(db_path, rounds, workers):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        BCRYPT_LOG_ROUNDS = rounds
+        BCRYPT_WORKERS = workers
+        BCRYPT_WAIT_TIMEOUT = None
+        METRICS_ENABLED = False
+    return BenchConfig
+
+
+def seed_users(app, count, password):
+    from app import db
+    from app.models import Person
+    with app.app_context():
+        db.create_all()
+        hashed = Person(name='seed', email='seed@example.com')
+        hashed.set_password(password)
+        db.session.bulk_insert_mappings(Person, [
+            {'name': f'User {i}', 'email': f'user{i}@example.com', 'role': 'User', 'password': hashed.password}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def run(app, users, threads, logins, password):
+    local = threading.local()
+
+    def login(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post('/login', data={'email': f'user{i % users}@example.com', 'password': password})
+        return response.status_code == 302
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    return ok, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=None, help='bcrypt pool size (default: CPU count)')
+    args = parser.parse_args()
+
+    from app import create_app
+    password = 'Benchmark#1'
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(os.path.join(tmp, 'bench.db'), args.rounds, args.workers))
+        seed_users(app, args.users, password)
+        pool = app.extensions['password_hasher']
+        print(f'bcrypt rounds={pool.rounds} pool workers={pool.workers}')
+        print(f'{"threads":>8} {"logins":>8} {"seconds":>9} {"logins/s":>9}')
+        for threads in args.threads:
+            ok, elapsed = run(app, args.users, threads, args.logins, password)
+            print(f'{threads:>8} {ok:>8} {elapsed:>9.2f} {ok / elapsed:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Query plans of the hot queries at a realistic data volume.
+
+Builds a throwaway SQLite database with `flask db upgrade`'s migrations, fills
+it with a registration-sized synthetic university from benchmarks.datagen,
+runs ANALYZE so the planner has statistics, and checks every query in
+app.query_plans uses its index. Exits non-zero if any does not. Run from the repository root:
+
+    python -m benchmarks.query_plans --students 20000 --courses 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks.datagen import Scale, build, make_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--exams', type=int, default=4, help='exams per course')
+    parser.add_argument('--classes', type=int, default=20, help='attendance days per course')
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+    from app import create_app, db
+    from app.query_plans import check_plans
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(f"sqlite:///{os.path.join(tmp, 'plans.db')}"))
+        scale = Scale(students=args.students, courses=args.courses,
+                      exams_per_course=args.exams, classes_per_course=args.classes)
+        population, elapsed = build(app, scale)
+        print(', '.join(f'{n} {name}' for name, n in sorted(population.counts.items())) + f' seeded in {elapsed:.1f}s')
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text('ANALYZE'))
+
+            failures = 0
+            for name, ok, detail in check_plans(db.engine):
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
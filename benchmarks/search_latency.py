@@ -0,0 +1,88 @@
+"""Search and autocomplete latency on a large directory of people.
+
+Builds a synthetic university with --people students (no exams or
+attendance, which search does not touch) on a throwaway SQLite database, so
+queries go through the FTS5 index, and times the admin autocomplete and
+search endpoints through the test client for prefixes of real names, emails
+and student IDs. Reports p50/p95/p99 per endpoint and exits non-zero when
+autocomplete p95 is over --budget-ms. Run from the repository root:
+
+    python -m benchmarks.search_latency --people 100000 --queries 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks import datagen
+from benchmarks.enrollment_load import percentile
+
+
+def sample_queries(app, count, seed):
+    """Prefixes of indexed names, emails and student IDs, two to six characters long."""
+    from app import db
+    from app.models import SearchDocument
+    rng = random.Random(seed)
+    with app.app_context():
+        documents = db.session.query(SearchDocument.title, SearchDocument.body).limit(20000).all()
+    queries = []
+    for _ in range(count):
+        title, body = rng.choice(documents)
+        word = rng.choice((title.split() + body.split())[:4])
+        queries.append(word[:rng.randint(2, 6)])
+    return queries
+
+
+def timed(client, url, queries):
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        response = client.get(url, query_string={'q': q})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}?q={q} returned {response.status_code}')
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--people', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--budget-ms', type=float, default=20.0, help='autocomplete p95 budget')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from app import create_app
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(datagen.make_config(f"sqlite:///{os.path.join(tmp, 'search.db')}"))
+        scale = datagen.Scale(students=args.people, exams_per_course=0, classes_per_course=0)
+        population, elapsed = datagen.build(app, scale, args.seed)
+        print(f"{population.counts['SearchDocument']} search documents, {sum(population.counts.values())} rows "
+              f'generated in {elapsed:.1f}s')
+
+        client = app.test_client()
+        client.post('/login', data={'email': population.admins[0], 'password': datagen.PASSWORD})
+        queries = sample_queries(app, args.queries, args.seed)
+        timed(client, '/admin/search/autocomplete', queries[:50])  # warm up templates and caches
+
+        results = {}
+        for name, url, sample in (
+            ('autocomplete', '/admin/search/autocomplete', queries),
+            ('search', '/admin/search', queries[:max(1, len(queries) // 4)]),
+        ):
+            latencies = timed(client, url, sample)
+            results[name] = latencies
+            print(f'{name:>12}: {len(latencies)} queries ' + ' '.join(
+                f'p{q}={percentile(latencies, q) * 1000:.1f}ms' for q in (50, 95, 99)
+            ) + f' max={latencies[-1] * 1000:.1f}ms')
+
+    p95 = percentile(results['autocomplete'], 95) * 1000
+    if p95 > args.budget_ms:
+        print(f'autocomplete p95 {p95:.1f}ms is over the {args.budget_ms:.0f}ms budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import pytest
+from benchmarks import datagen
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The app on a small synthetic university, with TESTING on so query budgets are enforced."""
+    from app import create_app
+    root = tmp_path_factory.mktemp('ums')
+
+    class TestConfig(datagen.make_config(f"sqlite:///{root / 'ums.db'}")):
+        TESTING = True
+
+    app = create_app(TestConfig)
+    app.population, _ = datagen.build(app, datagen.Scale(0.05), seed=1)
+    return app
+
+
+@pytest.fixture(scope='session')
+def population(app):
+    return app.population
+
+
+@pytest.fixture
+def login(app):
+    """Log in as ``email`` and return the test client."""
+    def login(email):
+        client = app.test_client()
+        response = client.post('/login', data={'email': email, 'password': datagen.PASSWORD})
+        assert response.status_code == 302
+        return client
+    return login
@@ -0,0 +1,71 @@
+import pytest
+
+# Every list view declares a query budget; under TESTING a view that issues more
+# SQL statements than that (an N+1 load, typically) fails its request here.
+
+ADMIN_VIEWS = [
+    '/admin/students',
+    '/admin/students?sort=name&dir=desc',
+    '/admin/professors',
+    '/admin/courses',
+    '/admin/departments',
+    '/admin/payments',
+    '/admin/payments?sort=amount',
+    '/admin/enrollments',
+    '/admin/enrollments?sort=studID',
+    '/admin/users',
+    '/admin/search?q=Department',
+    '/admin/search/autocomplete?q=Dep',
+    '/api/v1/people',
+    '/api/v1/enrollments?fields=enrollmentID,studID,courseID',
+    '/api/v1/grades/changes',
+]
+
+PROFESSOR_VIEWS = [
+    '/professor/courses',
+    '/professor/courses/{courseID}/exams',
+    '/professor/exams/{examID}/submissions',
+    '/professor/courses/{courseID}/attendance',
+]
+
+STUDENT_VIEWS = [
+    '/student/dashboard',
+    '/student/summary',
+    '/student/enrolled_courses',
+    '/student/courses/{courseID}/exams',
+    '/student/exams/{examID}/marks',
+    '/student/courses/{courseID}/attendance',
+]
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f'{url} returned {response.status_code}'
+    return response
+
+
+@pytest.mark.parametrize('url', ADMIN_VIEWS)
+def test_admin_views_stay_within_budget(login, population, url):
+    _get(login(population.admins[0]), url)
+
+
+def test_admin_next_page_stays_within_budget(login, population):
+    client = login(population.admins[0])
+    page = _get(client, '/api/v1/people?per_page=20').get_json()
+    _get(client, page['links']['next'])
+
+
+@pytest.mark.parametrize('url', PROFESSOR_VIEWS)
+def test_professor_views_stay_within_budget(login, population, url):
+    email, _, courses = next(professor for professor in population.professors
+                             if any(population.assignments.get(courseID) for courseID in professor[2]))
+    courseID = next(courseID for courseID in courses if population.assignments.get(courseID))
+    _get(login(email), url.format(courseID=courseID, examID=population.assignments[courseID][0]))
+
+
+@pytest.mark.parametrize('url', STUDENT_VIEWS)
+def test_student_views_stay_within_budget(login, population, url):
+    email, _, courses = next(student for student in population.students
+                             if any(population.assignments.get(courseID) for courseID in student[2]))
+    courseID = next(courseID for courseID in courses if population.assignments.get(courseID))
+    _get(login(email), url.format(courseID=courseID, examID=population.assignments[courseID][0]))